@@ -1,11 +1,11 @@
 import logging as log
-import traceback
-from typing import List, Set
+from typing import Dict, List, Set, Tuple
 from time import time as ts
 from git import Commit
-from pydriller import RepositoryMining
 
-from szz.core.abstract_szz import AbstractSZZ, ImpactedFile
+from szz.core import metrics
+from szz.core.abstract_szz import AbstractSZZ, BlameData, ImpactedFile
+from szz.core.commit_index import ChangeSizeIndex
 
 
 class AGSZZ(AbstractSZZ):
@@ -13,43 +13,105 @@ class AGSZZ(AbstractSZZ):
     Annotation-Graph SZZ implementation.
     """
 
-    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None):
-        super().__init__(repo_full_name, repo_url, repos_dir)
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None, **kwargs):
+        super().__init__(repo_full_name, repo_url, repos_dir, **kwargs)
+        self.__change_size_index = None
+        self.__commits_by_change_size = dict()
 
+    @property
+    def change_size_index(self) -> ChangeSizeIndex:
+        """
+         Getter of the index of the number of files modified by each commit, built at first use and shared by all
+         the fix commits analyzed with this instance.
+
+         :returns ChangeSizeIndex change_size_index
+        """
+        if self.__change_size_index is None:
+            self.__change_size_index = ChangeSizeIndex(self.repository_path)
+        return self.__change_size_index
+
+    @metrics.stage('exclude_commits_by_change_size')
     def _exclude_commits_by_change_size(self, commit_hash: str, max_change_size: int = 20) -> Set[str]:
+        key = (commit_hash, max_change_size)
+        if key in self.__commits_by_change_size:
+            return self.__commits_by_change_size[key]
+
         to_exclude = set()
-        repo_mining = RepositoryMining(self.repository_path, to_commit=commit_hash, order='reverse').traverse_commits()
-        for commit in repo_mining:
-            try:
-                if len(commit.modifications) > max_change_size:
-                    to_exclude.add(commit.hash)
-                else:
-                    break
-            except Exception as e:
-                log.error(f'unable to analyze commit: {self.repository_path} {commit.hash}')
+        try:
+            to_exclude = self.change_size_index.contiguous_large_commits(commit_hash, max_change_size)
+        except Exception as e:
+            log.error(f'unable to analyze commit: {self.repository_path} {commit_hash}')
 
         if len(to_exclude) > 0:
             log.info(f'count of commits excluded by change size > {max_change_size}: {len(to_exclude)}')
 
+        self.__commits_by_change_size[key] = to_exclude
         return to_exclude
 
-    def _ag_annotate(self, impacted_files, **kwargs) -> Set[Commit]:
+    def _ag_annotate(self, impacted_files, blame_state: Dict[str, Set['BlameData']] = None,
+                     commits_to_reblame: Set[str] = None, rev: str = 'HEAD^', **kwargs) -> Set['BlameData']:
+        """
+        Blame the modified lines of the impacted files. If a blame state is given, the blame data of each file are
+        stored in it and, for the files already blamed in a previous pass, only the lines currently attributed to
+        commits_to_reblame are blamed again, while the other lines keep their attribution.
+
+        :param List[ImpactedFile] impacted_files: list of impacted files in fix commit
+        :param Dict[str, Set[BlameData]] blame_state: blame data of the previous pass, by file path (optional)
+        :param Set[str] commits_to_reblame: hashes of the commits ignored since the previous pass
+        :param str rev: revision to blame, i.e. the parent of the fix commit (default HEAD^)
+        :returns Set[BlameData] blame data of all the impacted files
+        """
+        blame_requests = list()
+        settled_blame = dict()
+        for imp_file in impacted_files:
+            blame_info = None if blame_state is None else blame_state.get(imp_file.file_path)
+            if blame_info is None:
+                modified_lines = imp_file.modified_lines
+            else:
+                settled, modified_lines = self.__split_settled(blame_info, commits_to_reblame or set())
+                if len(modified_lines) == 0:
+                    settled_blame[imp_file.file_path] = blame_info
+                    continue
+                log.info(f're-blaming {len(modified_lines)} lines of {imp_file.file_path}, {len(settled)} blamed lines settled')
+                settled_blame[imp_file.file_path] = settled
+
+            blame_requests.append(dict(
+                rev=rev,
+                file_path=imp_file.file_path,
+                modified_lines=modified_lines,
+                ignore_whitespaces=True,
+                skip_comments=True,
+                **kwargs
+            ))
+
+        blame_results = dict(zip([r['file_path'] for r in blame_requests], self._blame_files(blame_requests)))
+
         blame_data = set()
         for imp_file in impacted_files:
-            try:
-                blame_info = self._blame(
-                    rev='HEAD^',
-                    file_path=imp_file.file_path,
-                    modified_lines=imp_file.modified_lines,
-                    ignore_whitespaces=True,
-                    skip_comments=True,
-                    **kwargs
-                )
-                blame_data.update(blame_info)
-            except:
-                log.error(traceback.format_exc())
+            if imp_file.file_path in blame_results:
+                blame_info = blame_results[imp_file.file_path]
+                if blame_info is None:
+                    # the blame failed
+                    continue
+                if imp_file.file_path in settled_blame:
+                    blame_info = self._merge_blame_data(settled_blame[imp_file.file_path], blame_info)
+            else:
+                blame_info = settled_blame[imp_file.file_path]
+
+            if blame_state is not None:
+                blame_state[imp_file.file_path] = blame_info
+            blame_data.update(blame_info)
         return blame_data
 
+    def __split_settled(self, blame_info: Set['BlameData'], commits_to_reblame: Set[str]) -> Tuple[Set['BlameData'], List[int]]:
+        settled = set([bd for bd in blame_info if bd.commit_hash not in commits_to_reblame])
+        lines_to_reblame = set()
+        for bd in blame_info:
+            if bd.commit_hash in commits_to_reblame:
+                lines_to_reblame.update(bd.final_line_nums)
+
+        return settled, sorted(lines_to_reblame)
+
     # TODO: add type check on kwargs
     def find_bic(self, fix_commit_hash: str, impacted_files: List['ImpactedFile'], **kwargs) -> Set[Commit]:
         """
@@ -60,6 +122,10 @@ class AGSZZ(AbstractSZZ):
         :key ignore_revs_file_path (str): specify ignore revs file for git blame to ignore specific commits.
         :key max_change_size (int): if the number of modified files exceeds the threshold, the commit will be excluded (default 20)
         :key exclude_merge_commits (bool): if true, merge commits will be excluded (default False)
+        :key incremental_blame (bool): if true, after the first pass only the lines attributed to the newly ignored
+            commits are blamed again (default False)
+        :key prune_by_issue_date (bool): if true, with the issue date filter, the candidates authored after the issue
+            date are dropped before checking their change size (default False)
         :returns Set[Commit] a set of bug introducing commits candidates, represented by Commit object
         """
 
@@ -68,11 +134,15 @@ class AGSZZ(AbstractSZZ):
         self._set_working_tree_to_commit(fix_commit_hash)
 
         max_change_size = kwargs.get('max_change_size', 20)
+        pruning_date = self._pruning_date(**kwargs)
 
         params = dict()
         params['ignore_revs_file_path'] = kwargs.get('ignore_revs_file_path', None)
         params['ignore_revs_list'] = list()
 
+        blame_state = dict() if kwargs.get('incremental_blame', False) else None
+        commits_to_reblame = set()
+
         log.info("staring blame")
         to_blame = True
         start = ts()
@@ -80,13 +150,13 @@ class AGSZZ(AbstractSZZ):
         commits_to_ignore = set()
         while to_blame:
             log.info(f"excluding commits: {params['ignore_revs_list']}")
-            blame_data = self._ag_annotate(impacted_files, **params)
+            blame_data = self._ag_annotate(impacted_files, blame_state, commits_to_reblame, f'{fix_commit_hash}^', **params)
 
             new_commits_to_ignore = set()
             for bd in blame_data:
-                if bd.commit.hexsha not in new_commits_to_ignore:
-                    if bd.commit.hexsha not in commits_to_ignore:
-                        new_commits_to_ignore.update(self._exclude_commits_by_change_size(bd.commit.hexsha, max_change_size=max_change_size))
+                if bd.commit_hash not in new_commits_to_ignore:
+                    if bd.commit_hash not in commits_to_ignore and not (pruning_date is not None and self._authored_after(bd.commit_hash, pruning_date)):
+                        new_commits_to_ignore.update(self._exclude_commits_by_change_size(bd.commit_hash, max_change_size=max_change_size))
 
             if len(new_commits_to_ignore) == 0:
                 to_blame = False
@@ -94,10 +164,14 @@ class AGSZZ(AbstractSZZ):
                 log.error(f"blame timeout for {self.repository_path}")
                 to_blame = False
 
+            commits_to_reblame = new_commits_to_ignore - commits_to_ignore
             commits_to_ignore.update(new_commits_to_ignore)
             params['ignore_revs_list'] = list(commits_to_ignore)
 
-        bic = set([bd.commit for bd in blame_data if bd.commit.hexsha not in self._exclude_commits_by_change_size(bd.commit.hexsha, max_change_size)])
+        bic_hashes = set([bd.commit_hash for bd in blame_data])
+        if pruning_date is not None:
+            bic_hashes = set([commit_hash for commit_hash in bic_hashes if not self._authored_after(commit_hash, pruning_date)])
+        bic = self._get_commits(set([commit_hash for commit_hash in bic_hashes if commit_hash not in self._exclude_commits_by_change_size(commit_hash, max_change_size)]))
     
         if 'issue_date_filter' in kwargs and kwargs['issue_date_filter']:
             before = len(bic)
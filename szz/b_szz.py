@@ -1,5 +1,4 @@
 import logging as log
-import traceback
 from typing import List, Set
 
 from git import Commit
@@ -17,8 +16,8 @@ class BaseSZZ(AbstractSZZ):
 
     """
 
-    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None):
-        super().__init__(repo_full_name, repo_url, repos_dir)
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None, **kwargs):
+        super().__init__(repo_full_name, repo_url, repos_dir, **kwargs)
 
     def find_bic(self, fix_commit_hash: str, impacted_files: List['ImpactedFile'], **kwargs) -> Set[Commit]:
         """
@@ -35,20 +34,22 @@ class BaseSZZ(AbstractSZZ):
         ignore_revs_file_path = kwargs.get('ignore_revs_file_path', None)
         self._set_working_tree_to_commit(fix_commit_hash)
 
-        bug_introd_commits = set()
-        for imp_file in impacted_files:
-            try:
-                blame_data = self._blame(
-                    rev='HEAD^',
-                    file_path=imp_file.file_path,
-                    modified_lines=imp_file.modified_lines,
-                    ignore_revs_file_path=ignore_revs_file_path,
-                    ignore_whitespaces=False,
-                    skip_comments=False
-                )
-                bug_introd_commits.update([entry.commit for entry in blame_data])
-            except:
-                print(traceback.format_exc())
+        bic_hashes = set()
+        blame_requests = [dict(
+            rev=f'{fix_commit_hash}^',
+            file_path=imp_file.file_path,
+            modified_lines=imp_file.modified_lines,
+            ignore_revs_file_path=ignore_revs_file_path,
+            ignore_whitespaces=False,
+            skip_comments=False
+        ) for imp_file in impacted_files]
+        for blame_data in self._blame_files(blame_requests):
+            if blame_data is not None:
+                bic_hashes.update([entry.commit_hash for entry in blame_data])
+        pruning_date = self._pruning_date(**kwargs)
+        if pruning_date is not None:
+            bic_hashes = set([commit_hash for commit_hash in bic_hashes if not self._authored_after(commit_hash, pruning_date)])
+        bug_introd_commits = self._get_commits(bic_hashes)
 
         if 'issue_date_filter' in kwargs and kwargs['issue_date_filter']:
             before = len(bug_introd_commits)
@@ -1,17 +1,47 @@
+import hashlib
+import json
 import logging as log
 import ntpath
 import os
+import sys
+import threading
 from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from shutil import copytree
 from enum import Enum
 from shutil import rmtree
-from typing import List, Set
+from typing import Iterable, List, Optional, Set, Tuple, Union
 from tempfile import mkdtemp
 import traceback
-from git import Commit, Repo
-from pydriller import ModificationType, GitRepository as PyDrillerGitRepo
+from git import Commit, Git, Repo
+from git.exc import GitCommandNotFound
+from gitdb.util import bin_to_hex, hex_to_bin
 
-from .comment_parser import parse_comments
+from . import metrics
+from .blob_reader import BlobReader, DEFAULT_BLOB_CACHE_SIZE
+from .comment_parser import CommentRange, parse_comments, parse_comments_batch
+from .git_blame import BlameLine, blame_lines
+from .git_diff import diff_tree_changes, diff_tree_hunks
+from .persistent_cache import PersistentCache
+
+
+class _Git(Git):
+    """ GitPython command wrapper that records the git processes it spawns """
+    def execute(self, *args, **kwargs):
+        spawned = True
+        try:
+            return super().execute(*args, **kwargs)
+        except GitCommandNotFound:
+            spawned = False
+            raise
+        finally:
+            if spawned:
+                metrics.count_process('git')
+
+
+class _Repo(Repo):
+    GitCommandWrapperType = _Git
 
 
 class DetectLineMoved(Enum):
@@ -33,10 +63,15 @@ class AbstractSZZ(ABC):
     """
     AbstractSZZ is the base class for SZZ implementations. It has core methods for SZZ
     like blame and a diff parsing for impacted files. GitPython is used for base Git
-    commands and PyDriller to parse commit modifications.
+    commands, while diffs and blames are parsed from the output of git diff-tree and git blame.
     """
 
-    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None):
+    # with checkout_free, implementations running tools that cannot read a bare repository clone it with a .git folder
+    _bare_repository_supported = True
+
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None,
+                 blob_cache_size: int = DEFAULT_BLOB_CACHE_SIZE, cache_dir: str = None, checkout_free: bool = False,
+                 blame_workers: int = 1):
         """
         Init an abstract SZZ to use as base class for SZZ implementations.
         AbstractSZZ uses a temp folder to clone and interact with the given git repo, where
@@ -46,11 +81,37 @@ class AbstractSZZ(ABC):
         :param str repo_full_name: full name of the Git repository to clone and interact with
         :param str repo_url: url of the Git repository to clone
         :param str repos_dir: temp folder where to clone the given repo
+        :param int blob_cache_size: max size in bytes of the file contents cached while blaming (default 64 MB)
+        :param str cache_dir: directory of the persistent cache shared across runs (e.g. parsed comments and blame
+            results). If not set, results are cached only in memory for the lifetime of this instance
+        :param bool checkout_free: never reset the index and working tree to the fix commits. The local repository in
+            repos_dir is used in place, without copying it, and can be a bare repository (unless the implementation does
+            not support it). If the repository is cloned, the clone is bare or, if bare repositories are not supported,
+            has no checked out files
+        :param int blame_workers: max number of files of a fix commit blamed at the same time (default 1)
         """
         self._repository = None
+        self._repo_full_name = repo_full_name
+        self._blob_reader = None
+        self._cache = PersistentCache(cache_dir) if cache_dir else None
+        self.__comment_ranges = dict()
+        self.__authored_dates = dict()
+        self.__authored_dates_lock = threading.Lock()
+        self._checkout_free = checkout_free
+        self._blame_workers = max(1, blame_workers)
+        self.__blame_pool = None
 
         self.__temp_dir = mkdtemp(dir=os.getcwd())
         self._repository_path = os.path.join(self.__temp_dir, repo_full_name.replace('/', '_'))
+        if checkout_free and repos_dir:
+            # the repository is only read, so it can be shared with other instances and processes
+            self._repository_path = os.path.join(repos_dir, repo_full_name)
+            if not os.path.isdir(self._repository_path):
+                log.error(f'unable to find local repository path: {self._repository_path}')
+                exit(-4)
+            if not self._bare_repository_supported and not os.path.isdir(os.path.join(self._repository_path, '.git')):
+                log.error(f'unable to use a bare repository with {type(self).__name__}: {self._repository_path}')
+                exit(-4)
         if not os.path.isdir(self._repository_path):
             if repos_dir:
                 repo_dir = os.path.join(repos_dir, repo_full_name)
@@ -61,14 +122,27 @@ class AbstractSZZ(ABC):
                     exit(-4)
             else:
                 log.info(f"Cloning repository {repo_full_name}...")
-                Repo.clone_from(url=repo_url, to_path=self._repository_path)
+                Repo.clone_from(url=repo_url, to_path=self._repository_path, bare=checkout_free and self._bare_repository_supported,
+                                no_checkout=checkout_free)
+                metrics.count_process('git')
 
-        self._repository = Repo(self._repository_path)
+        self._repository = _Repo(self._repository_path)
+        self._blob_reader = BlobReader(self._repository_path, blob_cache_size)
 
     def __del__(self):
         log.info("cleanup objects...")
+        self.close()
+
+    def close(self):
+        """
+        Release the repository used by this SZZ instance, removing the local copy of the repository. An instance
+        can be used to analyze many fix commits of the same repository, so the cleanup is not bound to find_bic().
+        Calling close() more than once has no effect.
+        """
+        self.__shutdown_blame_pool()
         self.__cleanup_repo()
         self.__clear_gitpython()
+        self.__clear_caches()
 
     @property
     def repository(self) -> Repo:
@@ -100,13 +174,15 @@ class AbstractSZZ(ABC):
         """
         pass
 
+    @metrics.stage('get_impacted_files')
     def get_impacted_files(self, fix_commit_hash: str,
                            file_ext_to_parse: List[str] = None,
                            only_deleted_lines: bool = True) -> List['ImpactedFile']:
         """
-         Parse the diff of given fix commit using PyDriller to obtain a list of ImpactedFile with
+         Parse the diff of given fix commit with respect to its parent to obtain a list of ImpactedFile with
          impacted file path and modified line ranges. As default behaviour, all deleted lines in the diff which
-         are also added are treated as modified lines.
+         are also added are treated as modified lines. The diff is computed by git without context lines and limited
+         to the files to parse, then only its hunk headers are read.
 
         :param List[str] file_ext_to_parse: parse only the given file extensions
         :param only_deleted_lines: considers as modified lines only the line numbers that are deleted and added.
@@ -116,38 +192,41 @@ class AbstractSZZ(ABC):
         """
         impacted_files = list()
 
-        fix_commit = PyDrillerGitRepo(self.repository_path).get_commit(fix_commit_hash)
-        for mod in fix_commit.modifications:
-            # skip newly added files
-            if not mod.old_path:
-                continue
-
-            # filter files by extension
+        fix_commit = self.repository.commit(fix_commit_hash)
+        # as in PyDriller, merge commits and the root commit have no modified files
+        if len(fix_commit.parents) == 1:
+            parent_hash = fix_commit.parents[0].hexsha
+            changes = None
             if file_ext_to_parse:
-                ext = mod.filename.split('.')
-                if len(ext) < 2 or (len(ext) > 1 and ext[1] not in file_ext_to_parse):
-                    log.info(f"skip file: {mod.filename}")
-                    continue
-
-            file_path = mod.new_path
-            if mod.change_type == ModificationType.DELETE or mod.change_type == ModificationType.RENAME:
-                file_path = mod.old_path
-
-            lines_added = [added[0] for added in mod.diff_parsed['added']]
-            lines_deleted = [deleted[0] for deleted in mod.diff_parsed['deleted']]
-
-            if only_deleted_lines:
-                mod_lines = lines_deleted
-            else:
-                mod_lines = [ld for ld in lines_deleted if ld in lines_added]
-
-            if len(mod_lines) > 0:
-                impacted_files.append(ImpactedFile(file_path, mod_lines))
+                # filter the files by extension before computing the diff of their contents
+                changes = list()
+                for change in diff_tree_changes(self.repository_path, parent_hash, fix_commit.hexsha):
+                    filename = os.path.basename(change.new_path or change.old_path)
+                    ext = filename.split('.')
+                    if len(ext) < 2 or (len(ext) > 1 and ext[1] not in file_ext_to_parse):
+                        log.info(f"skip file: {filename}")
+                        continue
+                    changes.append(change)
+
+            if changes is None or len(changes) > 0:
+                for file_diff in diff_tree_hunks(self.repository_path, parent_hash, fix_commit.hexsha, changes):
+                    # skip newly added files
+                    if not file_diff.old_path:
+                        continue
+
+                    if only_deleted_lines:
+                        mod_lines = file_diff.deleted_lines
+                    else:
+                        mod_lines = [ld for ld in file_diff.deleted_lines if ld in file_diff.added_lines]
+
+                    if len(mod_lines) > 0:
+                        impacted_files.append(ImpactedFile(file_diff.old_path, mod_lines))
 
         log.info([str(f) for f in impacted_files])
 
         return impacted_files
 
+    @metrics.stage('blame')
     def _blame(self, rev: str,
                file_path: str,
                modified_lines: List[int],
@@ -192,25 +271,154 @@ class AbstractSZZ(ABC):
         if detect_move_from_other_files and detect_move_from_other_files == DetectLineMoved.ANY_COMMIT:
             kwargs['C'] = [True, True, True]
 
-        bug_introd_commits = set()
+        bug_introd_commits = dict()
         mod_line_ranges = self._parse_line_ranges(modified_lines)
         log.info(f"processing file: {file_path}")
-        for entry in self.repository.blame_incremental(**kwargs, rev=rev, L=mod_line_ranges, file=file_path):
-            # entry.linenos = input lines to blame (current lines)
-            # entry.orig_lineno = output line numbers from blame (previous commit lines from blame)
-            for line_num in entry.orig_linenos:
-                source_file_content = self.repository.git.show(f"{entry.commit.hexsha}:{entry.orig_path}")
-                line_str = source_file_content.split('\n')[line_num - 1].strip()
-                b_data = BlameData(entry.commit, line_num, line_str, entry.orig_path)
+        # the 20-byte hash of each blamed commit is shared by all of its blame data
+        binshas = dict()
+        blamed_lines = self._blame_lines(rev, file_path, mod_line_ranges, kwargs)
+
+        # the blamed lines already have their content, the blamed versions of the file are read only to parse comments
+        comment_ranges = dict()
+        if skip_comments:
+            # the comments of all the blamed versions of the file are parsed at once
+            source_files = dict()
+            for bl in blamed_lines:
+                if (bl.commit_hash, bl.orig_path) not in source_files:
+                    source_files[(bl.commit_hash, bl.orig_path)] = self._blob_reader.get(bl.commit_hash, bl.orig_path)
+            parsed = self._get_comment_ranges_batch([(ntpath.basename(orig_path), source_file.content, source_file.hexsha)
+                                                     for (_, orig_path), source_file in source_files.items()])
+            comment_ranges = dict(zip(source_files.keys(), parsed))
+
+        for bl in blamed_lines:
+            line_str = bl.line.strip()
+            if skip_comments and self._in_comment_ranges(bl.orig_line_num, comment_ranges[(bl.commit_hash, bl.orig_path)]):
+                log.info(f"skip comment line ({bl.orig_line_num}): {line_str}")
+                continue
+
+            if bl.commit_hash not in binshas:
+                binshas[bl.commit_hash] = hex_to_bin(bl.commit_hash)
+            b_data = BlameData(binshas[bl.commit_hash], bl.orig_line_num, bl.orig_path, bl.final_line_num)
 
-                if skip_comments and self._is_comment(line_num, source_file_content, ntpath.basename(b_data.file_path)):
-                    log.info(f"skip comment line ({line_num}): {line_str}")
-                    continue
+            log.info(f'{b_data}: {line_str}')
+            if b_data in bug_introd_commits:
+                bug_introd_commits[b_data].add_final_line_nums(b_data.final_line_nums)
+            else:
+                bug_introd_commits[b_data] = b_data
 
-                log.info(b_data)
-                bug_introd_commits.add(b_data)
+        return set(bug_introd_commits)
+
+    def _get_commits(self, commit_hashes: Iterable[str]) -> Set[Commit]:
+        """
+        Get the GitPython Commit objects of the given commits. Blame data only keep commit hashes, so the Commit
+        objects are built only for the bug introducing commits, and their data are read at first access.
 
-        return bug_introd_commits
+        :param Iterable[str] commit_hashes: commit hashes
+        :returns Set[Commit] commits
+        """
+        return set([Commit(self.repository, hex_to_bin(commit_hash)) for commit_hash in commit_hashes])
+
+    @staticmethod
+    def _pruning_date(**kwargs) -> Optional[float]:
+        """
+        Get the date after which the blame candidates are dropped before being analyzed, i.e. the issue date when
+        both the issue date filter and the pruning by issue date are enabled.
+
+        :key issue_date_filter (bool): if true, the bug introducing commits are filtered by issue date
+        :key prune_by_issue_date (bool): if true, the candidates authored after the issue date are dropped as soon
+            as they are blamed
+        :key issue_date (float): timestamp of the issue date
+        :returns Optional[float] the pruning date, or None if the candidates are not pruned
+        """
+        if kwargs.get('issue_date_filter') and kwargs.get('prune_by_issue_date') and kwargs.get('issue_date') is not None:
+            return kwargs['issue_date']
+        return None
+
+    def _authored_after(self, commit_hash: str, date: float) -> bool:
+        """
+        Check if a commit was authored after the given date. The author dates are read once and shared by all the
+        fix commits analyzed with this instance.
+
+        :param str commit_hash: commit hash
+        :param float date: timestamp
+        :returns bool True if the commit was authored after the date
+        """
+        with self.__authored_dates_lock:
+            if commit_hash not in self.__authored_dates:
+                try:
+                    self.__authored_dates[commit_hash] = Commit(self.repository, hex_to_bin(commit_hash)).authored_date
+                except Exception as e:
+                    log.error(f'unable to read author date: {self.repository_path} {commit_hash}')
+                    self.__authored_dates[commit_hash] = None
+            authored_date = self.__authored_dates[commit_hash]
+
+        return authored_date is not None and authored_date > date
+
+    def _blame_files(self, blame_requests: List[dict]) -> List[Optional[Set['BlameData']]]:
+        """
+        Run many blames, up to blame_workers at the same time. Each blame runs its own git process and the shared
+        readers and caches are thread-safe, so the impacted files of a fix commit can be blamed concurrently.
+
+        :param List[dict] blame_requests: params of _blame for each blame
+        :returns List[Set[BlameData]] the result of each blame, in the same order, or None if the blame failed
+        """
+        def blame(blame_request: dict) -> Optional[Set['BlameData']]:
+            try:
+                return self._blame(**blame_request)
+            except:
+                log.error(traceback.format_exc())
+                return None
+
+        if self._blame_workers == 1 or len(blame_requests) < 2:
+            return [blame(blame_request) for blame_request in blame_requests]
+
+        if self.__blame_pool is None:
+            self.__blame_pool = ThreadPoolExecutor(max_workers=self._blame_workers)
+        return list(self.__blame_pool.map(blame, blame_requests))
+
+    def _blame_lines(self, rev: str, file_path: str, line_ranges: List[str], blame_args: dict) -> List[BlameLine]:
+        """
+        Run git blame and return its compact result, one record for each blamed line. If the persistent cache is available, results are cached by the
+        whole blame request: repository, resolved revision, file path, line ranges and blame params, where the
+        ignored revisions and the ignore revs file are represented by a hash of their content.
+
+        :param str rev: commit revision
+        :param str file_path: path of file to blame
+        :param List[str] line_ranges: line ranges to blame (param '-L' of git blame)
+        :param dict blame_args: params of git blame, in the GitPython format
+        :returns List[BlameLine] blamed_lines
+        """
+        cache_key = None
+        if self._cache:
+            cache_key = self.__blame_cache_key(rev, file_path, line_ranges, blame_args)
+            cached = self._cache.get('blame_lines', cache_key)
+            if cached is not None:
+                return [BlameLine(*bl) for bl in cached]
+
+        args = self.repository.git.transform_kwargs(**blame_args, L=line_ranges)
+        blamed_lines = list(blame_lines(self.repository_path, rev, file_path, args))
+
+        if cache_key:
+            self._cache.put('blame_lines', cache_key, [list(bl) for bl in blamed_lines])
+
+        return blamed_lines
+
+    def __blame_cache_key(self, rev: str, file_path: str, line_ranges: List[str], blame_args: dict) -> str:
+        args = dict(blame_args)
+        if 'ignore-rev' in args:
+            args['ignore-rev'] = hashlib.sha1(' '.join(sorted(args['ignore-rev'])).encode()).hexdigest()
+        if 'ignore-revs-file' in args:
+            with open(args['ignore-revs-file'], 'rb') as f:
+                args['ignore-revs-file'] = hashlib.sha1(f.read()).hexdigest()
+
+        request = {
+            'repo': self._repo_full_name,
+            'rev': self.repository.git.rev_parse(rev),
+            'file': file_path,
+            'L': line_ranges,
+            'args': args
+        }
+        return hashlib.sha1(json.dumps(request, sort_keys=True).encode()).hexdigest()
 
     def _parse_line_ranges(self, modified_lines: List) -> List[str]:
         """
@@ -243,10 +451,29 @@ class AbstractSZZ(ABC):
 
         return mod_line_ranges
 
+    def _merge_blame_data(self, blame_data: Set['BlameData'], new_blame_data: Set['BlameData']) -> Set['BlameData']:
+        """
+        Merge two sets of blame data. If a blamed line is in both sets, the blame data of the first set is kept and
+        its final line numbers are extended with the ones of the second set.
+
+        :param Set[BlameData] blame_data: blame data to keep
+        :param Set[BlameData] new_blame_data: blame data to add
+        :returns Set[BlameData] merged blame data
+        """
+        merged = {bd: bd for bd in blame_data}
+        for bd in new_blame_data:
+            if bd in merged:
+                merged[bd].add_final_line_nums(bd.final_line_nums)
+            else:
+                merged[bd] = bd
+
+        return set(merged)
+
     def _is_comment(self, line_num: int, source_file_content: str, source_file_name: str) -> bool:
         """
         Check if the given line is a comment. It uses a specific comment parser which returns the interval of line
-        numbers containing comments - CommentRange(start, end)
+        numbers containing comments - CommentRange(start, end). The blame parses the comments of all the blamed files
+        at once with _get_comment_ranges_batch, this method is kept for subclasses checking a single line.
 
         :param int line_num: line number
         :param str source_file_content: The content of the file to parse
@@ -255,18 +482,63 @@ class AbstractSZZ(ABC):
         """
 
         comment_ranges = parse_comments(source_file_content, source_file_name, self.__temp_dir)
+        return self._in_comment_ranges(line_num, comment_ranges)
 
+    def _in_comment_ranges(self, line_num: int, comment_ranges: List[CommentRange]) -> bool:
         for comment_range in comment_ranges:
             if comment_range.start <= line_num <= comment_range.end:
                 return True
         return False
 
+    @metrics.stage('is_comment')
+    def _get_comment_ranges_batch(self, source_files: List[Tuple[str, str, str]]) -> List[List[CommentRange]]:
+        """
+        Parse the comments of many files with a single call to the comment parser. The comment ranges are memoized
+        by blob id and file extension (which selects the comment parser), in memory and in the persistent cache if
+        available. Files that the parser fails to parse are treated as having no comments and are not cached on disk.
+
+        :param List[Tuple[str, str, str]] source_files: list of (file name, file content, blob id)
+        :returns List[List[CommentRange]] the comment ranges of each file
+        """
+        keys = [f'{blob_id}{os.path.splitext(file_name)[1]}' for file_name, _, blob_id in source_files]
+
+        missing = set(k for k in keys if k not in self.__comment_ranges)
+        if missing and self._cache:
+            for key, cached in self._cache.get_many('comment_ranges', missing).items():
+                self.__comment_ranges[key] = [CommentRange(start, end) for start, end in cached]
+
+        to_parse = dict()
+        for key, (file_name, file_str, _) in zip(keys, source_files):
+            if key not in self.__comment_ranges:
+                to_parse[key] = (file_name, file_str)
+
+        if to_parse:
+            parsed = parse_comments_batch(list(to_parse.values()), self.__temp_dir)
+            to_store = dict()
+            for key, comment_ranges in zip(to_parse.keys(), parsed):
+                if comment_ranges is not None:
+                    to_store[key] = [list(r) for r in comment_ranges]
+                self.__comment_ranges[key] = comment_ranges or list()
+            if self._cache:
+                self._cache.put_many('comment_ranges', to_store)
+
+        return [self.__comment_ranges[key] for key in keys]
+
     def _set_working_tree_to_commit(self, commit: str):
+        if self._checkout_free:
+            # blame and diffs only read revisions, the fix commit is never checked out
+            return
+
         # self.repository.head.reference = self.repository.commit(fix_commit_hash)
         # reset the index and working tree to match the pointed-to commit
         self.repository.head.reset(commit=commit, index=True, working_tree=True)
         assert not self.repository.head.is_detached
 
+    def __shutdown_blame_pool(self):
+        if self.__blame_pool is not None:
+            self.__blame_pool.shutdown(wait=True)
+            self.__blame_pool = None
+
     def __cleanup_repo(self):
         """ Cleanup of local repository used by SZZ """
         if os.path.isdir(self.__temp_dir):
@@ -277,38 +549,115 @@ class AbstractSZZ(ABC):
         if self._repository:
             self._repository.close()
             self._repository.__del__()
+            self._repository = None
+
+    def __clear_caches(self):
+        """ Release the caches of file contents and parsed comments """
+        if self._blob_reader:
+            self._blob_reader.close()
+        if self._cache:
+            self._cache.close()
+        self.__comment_ranges.clear()
+        self.__authored_dates.clear()
+
+
 class ImpactedFile:
     """ Data class to represent impacted files """
-    def __init__(self, file_path: str, modified_lines: List[int]):
+    __slots__ = ('file_path', '_modified_lines')
+
+    def __init__(self, file_path: str, modified_lines: Iterable[int]):
         """
         :param str file_path: previous path of the current impacted file
-        :param List[int] modified_lines: list of modified lines
+        :param Iterable[int] modified_lines: modified lines, stored as an array of ints
         :returns ImpactedFile
         """
-        self.file_path = file_path
+        self.file_path = sys.intern(file_path)
         self.modified_lines = modified_lines
 
+    @property
+    def modified_lines(self) -> array:
+        """
+         Getter of the modified lines.
+
+         :returns array modified_lines
+        """
+        return self._modified_lines
+
+    @modified_lines.setter
+    def modified_lines(self, modified_lines: Iterable[int]):
+        self._modified_lines = array('i', modified_lines)
+
     def __str__(self) -> str:
-        return f'{self.__class__.__name__}(file_path="{self.file_path}",modified_lines={self.modified_lines})'
+        return f'{self.__class__.__name__}(file_path="{self.file_path}",modified_lines={list(self.modified_lines)})'
 
 
 class BlameData:
-    """ Data class to represent blame data """
-    def __init__(self, commit: Commit, line_num: int, line_str: str, file_path: str):
+    """
+    Data class to represent blame data. The commit is stored as a hash, the path is interned and the final line
+    numbers are stored as a single int, or as a tuple only when many lines are attributed to the blamed line
+    """
+    __slots__ = ('binsha', 'line_num', 'file_path', '_final_line_nums')
+
+    def __init__(self, binsha: bytes, line_num: int, file_path: str, final_line_nums: Union[int, Iterable[int]] = None):
         """
-        :param Commit commit: commit detected by git blame
+        :param bytes binsha: 20-byte hash of the commit detected by git blame
         :param int line_num: number of the blamed line
-        :param str line_str: content of the blamed line
         :param str file_path: path of the blamed file
+        :param Union[int, Iterable[int]] final_line_nums: number(s) of the lines, in the blamed revision, attributed to
+            the blamed line
         :returns BlameData
         """
-        self.commit = commit
+        self.binsha = binsha
         self.line_num = line_num
-        self.line_str = line_str
-        self.file_path = file_path
+        self.file_path = sys.intern(file_path)
+        self.final_line_nums = final_line_nums
+
+    @property
+    def final_line_nums(self) -> Tuple[int, ...]:
+        """
+         Getter of the numbers of the lines, in the blamed revision, attributed to the blamed line.
+
+         :returns Tuple[int, ...] final_line_nums
+        """
+        if self._final_line_nums is None:
+            return tuple()
+        if isinstance(self._final_line_nums, int):
+            return (self._final_line_nums,)
+        return self._final_line_nums
+
+    @final_line_nums.setter
+    def final_line_nums(self, final_line_nums: Union[int, Iterable[int]]):
+        if final_line_nums is None or isinstance(final_line_nums, int):
+            self._final_line_nums = final_line_nums
+            return
+
+        final_line_nums = tuple(sorted(set(final_line_nums)))
+        if len(final_line_nums) == 0:
+            self._final_line_nums = None
+        elif len(final_line_nums) == 1:
+            self._final_line_nums = final_line_nums[0]
+        else:
+            self._final_line_nums = final_line_nums
+
+    def add_final_line_nums(self, final_line_nums: Iterable[int]):
+        """
+        Add lines of the blamed revision attributed to the blamed line.
+
+        :param Iterable[int] final_line_nums: numbers of the lines
+        """
+        self.final_line_nums = self.final_line_nums + tuple(final_line_nums)
+
+    @property
+    def commit_hash(self) -> str:
+        """
+         Getter of the hash of the commit detected by git blame.
+
+         :returns str commit_hash
+        """
+        return bin_to_hex(self.binsha).decode('ascii')
 
     def __str__(self) -> str:
-        return f'{self.__class__.__name__}(commit={self.commit.hexsha},line_num={self.line_num},file_path="{self.file_path}",line_str="{self.line_str}")'
+        return f'{self.__class__.__name__}(commit={self.commit_hash},line_num={self.line_num},file_path="{self.file_path}")'
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, self.__class__):
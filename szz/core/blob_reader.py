@@ -0,0 +1,123 @@
+import logging as log
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+from . import metrics
+
+DEFAULT_BLOB_CACHE_SIZE = 64 * 1024 * 1024
+
+
+class Blob:
+    """ Content of a file at a given revision """
+    def __init__(self, hexsha: str, content: str, size: int):
+        """
+        :param str hexsha: hash of the git blob object
+        :param str content: decoded content of the blob, without the trailing newline (same as 'git show')
+        :param int size: size in bytes of the raw blob
+        :returns Blob
+        """
+        self.hexsha = hexsha
+        self.content = content
+        self.size = size
+
+
+class BlobReader:
+    """
+    Read file contents from a Git repository using a single long-lived 'git cat-file --batch' process.
+    Blobs are kept in a LRU cache, keyed by (revision, path), whose size is bounded by a budget in bytes.
+    The reader is thread-safe.
+    """
+
+    def __init__(self, repository_path: str, max_cache_size: int = DEFAULT_BLOB_CACHE_SIZE):
+        """
+        :param str repository_path: local path of the Git repository
+        :param int max_cache_size: max size in bytes of the cached blobs. Use 0 to disable the cache
+        :returns BlobReader
+        """
+        self._repository_path = repository_path
+        self._max_cache_size = max_cache_size
+        self.__cache = OrderedDict()
+        self.__cache_size = 0
+        self.__process = None
+        self.__lock = threading.Lock()
+
+    def get(self, rev: str, file_path: str) -> Blob:
+        """
+        Get the content of a file at the given revision (i.e. the equivalent of 'git show <rev>:<file_path>').
+
+        :param str rev: commit revision
+        :param str file_path: path of the file
+        :returns Blob blob
+        """
+        key = (rev, file_path)
+        with self.__lock:
+            blob = self.__cache.get(key)
+            if blob is not None:
+                self.__cache.move_to_end(key)
+                return blob
+
+            blob = self.__read(f'{rev}:{file_path}')
+            self.__cache_blob(key, blob)
+
+        return blob
+
+    def close(self):
+        """ Stop the cat-file process and clear the cache. Calling close() more than once has no effect. """
+        with self.__lock:
+            self.__cache.clear()
+            self.__cache_size = 0
+            if self.__process is not None:
+                try:
+                    self.__process.stdin.close()
+                    self.__process.wait(timeout=5)
+                except Exception:
+                    self.__process.kill()
+                self.__process.stdout.close()
+                self.__process = None
+
+    def __start_process(self):
+        self.__process = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=self._repository_path,
+                                          stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        metrics.count_process('git')
+
+    def __read(self, object_name: str) -> Blob:
+        if '\n' in object_name:
+            raise ValueError(f'invalid object name: {object_name}')
+        if self.__process is None or self.__process.poll() is not None:
+            self.__start_process()
+
+        self.__process.stdin.write(object_name.encode('utf-8', 'surrogateescape') + b'\n')
+        self.__process.stdin.flush()
+
+        header = self.__process.stdout.readline().decode('utf-8', 'surrogateescape').rstrip('\n')
+        hexsha, obj_type, size = self.__parse_header(object_name, header)
+
+        raw = self.__process.stdout.read(size + 1)[:size]
+        if obj_type != 'blob':
+            raise ValueError(f'{object_name} is a {obj_type}, not a blob')
+
+        # strip the trailing newline, as GitPython does for the output of 'git show'
+        if raw.endswith(b'\n'):
+            raw = raw[:-1]
+
+        return Blob(hexsha, raw.decode('utf-8', 'surrogateescape'), size)
+
+    def __parse_header(self, object_name: str, header: str) -> Tuple[str, str, int]:
+        parts = header.split(' ')
+        if header.endswith(' missing') or header.endswith(' ambiguous') or len(parts) != 3:
+            raise KeyError(f'unable to read {object_name}: {header}')
+
+        return parts[0], parts[1], int(parts[2])
+
+    def __cache_blob(self, key: Tuple[str, str], blob: Blob):
+        if blob.size > self._max_cache_size:
+            return
+
+        self.__cache[key] = blob
+        self.__cache_size += blob.size
+        while self.__cache_size > self._max_cache_size:
+            _, evicted = self.__cache.popitem(last=False)
+            self.__cache_size -= evicted.size
+            log.debug(f'evicted blob from cache: {evicted.hexsha}')
@@ -0,0 +1,104 @@
+from time import perf_counter
+from typing import Callable, Dict, List, Set, Tuple
+
+
+class CandidateFilter:
+    """
+    A check that excludes bug introducing commit candidates. The check is called as check(szz, commit_hash,
+    file_path, **kwargs), where szz is the SZZ instance running the pipeline, and returns the hashes of the commits to
+    exclude: an empty set means that the candidate is kept. A per-file check excludes the commits only for the blamed
+    file (e.g. a meta-change), otherwise they are excluded for all the files of the fix commit. Checks should not hold
+    a reference to the SZZ instance owning the pipeline, or the instance is not released until a garbage collection.
+    """
+
+    def __init__(self, name: str, check: Callable[..., Set[str]], per_file: bool = False, cost: float = 1.0):
+        self.name = name
+        self.check = check
+        self.per_file = per_file
+        self.cost = cost
+        # the first check usually builds the index used by the filter (e.g. the git log of the repository), so it is
+        # not timed: the order of the filters depends only on the cost of a single check
+        self.warmed_up = False
+        self.calls = 0
+        self.time = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        """
+         Getter of the measured mean time of a check, excluding the first one, or of the declared cost until a check
+         has been timed.
+
+         :returns float mean_time
+        """
+        if self.calls == 0:
+            return self.cost
+        return self.time / self.calls
+
+
+class CandidateFilterPipeline:
+    """
+    The filters of the bug introducing commit candidates, run from the cheapest to the most expensive one (by their
+    measured mean time, without the first check of each filter) and stopping at the first filter that excludes the
+    candidate. The verdicts are memoized in a dict given by the caller, so each filter runs at most once per commit
+    (and file, for per-file filters).
+    """
+
+    def __init__(self):
+        self.__filters = dict()
+
+    @property
+    def filters(self) -> List[CandidateFilter]:
+        """
+         Getter of the registered filters, from the cheapest to the most expensive one.
+
+         :returns List[CandidateFilter] filters
+        """
+        return sorted(self.__filters.values(), key=lambda f: f.mean_time)
+
+    def register(self, name: str, check: Callable[..., Set[str]], per_file: bool = False, cost: float = 1.0):
+        """
+        Register a filter, replacing the one with the same name.
+
+        :param str name: name of the filter
+        :param Callable check: check(szz, commit_hash, file_path, **kwargs) returning the hashes of the commits to
+            exclude
+        :param bool per_file: if true, the commits are excluded only for the blamed file (default False)
+        :param float cost: expected time of a check, used to order the filters until it is measured (default 1.0)
+        """
+        self.__filters[name] = CandidateFilter(name, check, per_file, cost)
+
+    def unregister(self, name: str):
+        """
+        Remove a filter, if registered.
+
+        :param str name: name of the filter
+        """
+        self.__filters.pop(name, None)
+
+    def apply(self, szz, commit_hash: str, file_path: str, verdicts: Dict[tuple, Set[str]], **kwargs) -> Tuple[Set[str], Set[str]]:
+        """
+        Run the filters on a candidate until one of them excludes it.
+
+        :param AbstractSZZ szz: SZZ instance passed to the checks
+        :param str commit_hash: hash of the candidate
+        :param str file_path: path of the blamed file
+        :param Dict[tuple, Set[str]] verdicts: memoized verdicts, updated in place
+        :returns Tuple[Set[str], Set[str]] the commits to exclude for all the files and for the blamed file only
+        """
+        for candidate_filter in self.filters:
+            key = (candidate_filter.name, commit_hash, file_path if candidate_filter.per_file else None)
+            if key not in verdicts:
+                start = perf_counter()
+                try:
+                    verdicts[key] = candidate_filter.check(szz, commit_hash, file_path, **kwargs)
+                finally:
+                    if candidate_filter.warmed_up:
+                        candidate_filter.time += perf_counter() - start
+                        candidate_filter.calls += 1
+                    candidate_filter.warmed_up = True
+
+            to_exclude = verdicts[key]
+            if len(to_exclude) > 0:
+                return (set(), to_exclude) if candidate_filter.per_file else (to_exclude, set())
+
+        return set(), set()
@@ -1,13 +1,20 @@
 import logging as log
 import os
-import re
 import subprocess
 from collections import namedtuple
+from shutil import rmtree
+from typing import Dict, List, Optional, Tuple
+from xml.etree.ElementTree import ParseError, XMLPullParser
 import tempfile
 
+from . import metrics
+
 CommentRange = namedtuple('CommentRange', 'start end')
 srcml_file_ext = ['.c', '.h', '.hh', '.hpp', '.hxx', '.cxx', '.cpp', '.cc', '.cs', '.java']
 
+# max number of files parsed by a single srcML run, to keep the command line short
+SRCML_BATCH_SIZE = 200
+
 
 def parse_comments(file_str: str, file_name: str, temp_dir: str = tempfile.gettempdir()):
     if file_name.endswith(".py"):
@@ -28,35 +35,131 @@ def parse_comments_srcml(file_str: str, file_name: str, temp_folder: str = tempf
     line_comment_ranges = list()
 
     if any(file_name.endswith(e) for e in srcml_file_ext):
-        if not os.path.isdir(temp_folder):
-            os.makedirs(temp_folder)
-
-        file_name = os.path.join(temp_folder, 'temp_' + file_name)
-        with open(file_name, 'w') as temp_file:
-            temp_file.write(file_str)
-
-        process_out = list()
-        p = subprocess.Popen(f'srcml --position {file_name}', shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        for line in p.stdout.readlines():
-            process_out.append(line.decode('utf-8').strip())
-        status = p.wait()
-
-        if status == 0:
-            for line in process_out:
-                if line.strip().startswith("<comment"):
-                    line_comment_ranges.append(CommentRange(start=int(re.search('pos:start="(\d+):', line).groups()[0]),
-                                                            end=int(re.search('pos:end="(\d+):', line).groups()[0])))
-        else:
-            log.error(process_out)
-
-        if os.path.isfile(file_name):
-            os.remove(file_name)
+        line_comment_ranges = parse_comments_srcml_batch([(file_name, file_str)], temp_folder)[0] or list()
     else:
         log.error(f"file not supported by srcML: {file_name}")
 
     return line_comment_ranges
 
 
+def parse_comments_batch(files: List[Tuple[str, str]], temp_dir: str = tempfile.gettempdir()) -> List[Optional[List[CommentRange]]]:
+    """
+    Parse the comments of many files. All the files supported by srcML are parsed with a single srcML run.
+
+    :param List[Tuple[str, str]] files: list of (file name, file content) pairs
+    :param str temp_dir: folder used to write the temp files parsed by srcML
+    :returns List[Optional[List[CommentRange]]] the comment ranges of each file, None if the parsing failed
+    """
+    results = [None] * len(files)
+    srcml_files = list()
+    for i, (file_name, file_str) in enumerate(files):
+        if any(file_name.endswith(e) for e in srcml_file_ext):
+            srcml_files.append(i)
+        else:
+            results[i] = parse_comments(file_str, file_name, temp_dir)
+
+    srcml_results = parse_comments_srcml_batch([files[i] for i in srcml_files], temp_dir)
+    for i, comment_ranges in zip(srcml_files, srcml_results):
+        results[i] = comment_ranges
+
+    return results
+
+
+def parse_comments_srcml_batch(files: List[Tuple[str, str]], temp_folder: str = tempfile.gettempdir()) -> List[Optional[List[CommentRange]]]:
+    """
+    Parse the comments of many files supported by srcML, running srcML once for each chunk of SRCML_BATCH_SIZE files.
+    The srcML archive is stream-parsed and only the comments starting a line are returned, i.e. trailing comments
+    after the code of a line are ignored.
+
+    :param List[Tuple[str, str]] files: list of (file name, file content) pairs
+    :param str temp_folder: folder used to write the temp files parsed by srcML
+    :returns List[Optional[List[CommentRange]]] the comment ranges of each file, None if srcML failed
+    """
+    results = list()
+    for i in range(0, len(files), SRCML_BATCH_SIZE):
+        results.extend(_run_srcml(files[i:i + SRCML_BATCH_SIZE], temp_folder))
+
+    return results
+
+
+def _run_srcml(files: List[Tuple[str, str]], temp_folder: str) -> List[Optional[List[CommentRange]]]:
+    if not files:
+        return list()
+    if not os.path.isdir(temp_folder):
+        os.makedirs(temp_folder)
+
+    batch_dir = tempfile.mkdtemp(prefix='srcml_', dir=temp_folder)
+    try:
+        file_paths = dict()
+        for i, (file_name, file_str) in enumerate(files):
+            file_path = os.path.join(batch_dir, f'{i}_{os.path.basename(file_name)}')
+            with open(file_path, 'w', encoding='utf-8', errors='surrogateescape') as temp_file:
+                temp_file.write(file_str)
+            file_paths[file_path] = i
+
+        comments = [list() for _ in files]
+        with tempfile.TemporaryFile(dir=batch_dir) as stderr:
+            p = subprocess.Popen(['srcml', '--position'] + list(file_paths.keys()), stdout=subprocess.PIPE, stderr=stderr)
+            metrics.count_process('srcml')
+            try:
+                _parse_srcml_comments(p.stdout, file_paths, comments)
+            except ParseError as e:
+                log.error(f'unable to parse srcML output: {e}')
+                p.kill()
+                p.wait()
+                return [None] * len(files)
+            finally:
+                p.stdout.close()
+            status = p.wait()
+
+            if status != 0:
+                stderr.seek(0)
+                log.error(stderr.read().decode('utf-8', 'replace'))
+                return [None] * len(files)
+    except OSError as e:
+        log.error(f'unable to run srcML: {e}')
+        return [None] * len(files)
+    finally:
+        rmtree(batch_dir, ignore_errors=True)
+
+    results = list()
+    for (_, file_str), file_comments in zip(files, comments):
+        lines = file_str.split('\n')
+        results.append([CommentRange(start=start, end=end) for start, column, end in file_comments
+                        if _is_line_start(lines, start, column)])
+
+    return results
+
+
+def _parse_srcml_comments(stream, file_paths: Dict[str, int], comments: List[list]):
+    """ Stream-parse a srcML unit or archive, collecting (start line, start column, end line) of each comment by file """
+    parser = XMLPullParser(events=('start', 'end'))
+    current = None
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag == 'unit':
+                if event == 'start' and 'filename' in elem.attrib:
+                    current = file_paths.get(elem.attrib['filename'])
+                elif event == 'end':
+                    elem.clear()
+            elif tag == 'comment' and event == 'end' and current is not None:
+                positions = {k.rsplit('}', 1)[-1]: v for k, v in elem.attrib.items()}
+                if 'start' in positions and 'end' in positions:
+                    start_line, start_column = positions['start'].split(':')
+                    end_line = positions['end'].split(':')[0]
+                    comments[current].append((int(start_line), int(start_column), int(end_line)))
+    parser.close()
+
+
+def _is_line_start(lines: List[str], line_num: int, column: int) -> bool:
+    """ Check if only whitespaces precede the given position. Tabs are expanded as in srcML (--tabs=8) """
+    if line_num < 1 or line_num > len(lines):
+        return False
+    return lines[line_num - 1].expandtabs(8)[:column - 1].strip() == ''
+
+
 def js_comment_parser(file_str, file_name):
     line_comment_ranges = list()
 
@@ -0,0 +1,272 @@
+import heapq
+import logging as log
+import subprocess
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Iterator, List, Set, Tuple
+
+from pydriller import ModificationType
+
+from . import metrics
+
+# parents and committer date are needed to replay the order of 'git rev-list'
+CommitInfo = namedtuple('CommitInfo', 'parents committed_date files_count')
+MetaChangeInfo = namedtuple('MetaChangeInfo', 'merge mode_changes change_types')
+
+# change types of the --raw output of git, where M (modify) and T (type change) are not indexed
+RAW_CHANGE_TYPES = {
+    'A': ModificationType.ADD,
+    'C': ModificationType.COPY,
+    'D': ModificationType.DELETE,
+    'R': ModificationType.RENAME
+}
+RAW_ESCAPES = {'a': b'\a', 'b': b'\b', 't': b'\t', 'n': b'\n', 'v': b'\v', 'f': b'\f', 'r': b'\r', '"': b'"', '\\': b'\\'}
+
+
+def git_log_records(repository_path: str, log_args: List[str]) -> Iterator[Tuple[List[str], List[str]]]:
+    """
+    Stream the output of git log, splitting it by commit. The format of the commit header is '%H %P %ct'.
+
+    :param str repository_path: local path of the Git repository
+    :param List[str] log_args: revisions and diff options of git log
+    :returns Iterator[Tuple[List[str], List[str]]] the header fields and the non-empty diff lines of each commit
+    """
+    cmd = ['git', '-c', 'core.quotePath=false', 'log', '--no-color', '--no-show-signature', '--format=%x00%H %P %ct'] + log_args
+    p = subprocess.Popen(cmd, cwd=repository_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    metrics.count_process('git')
+    try:
+        header = None
+        lines = list()
+        for raw_line in p.stdout:
+            line = raw_line.decode('utf-8', 'surrogateescape').rstrip('\n')
+            if line.startswith('\x00'):
+                if header is not None:
+                    yield header, lines
+                header = line[1:].split()
+                lines = list()
+            elif line:
+                lines.append(line)
+
+        if header is not None:
+            yield header, lines
+    finally:
+        p.stdout.close()
+        p.wait()
+
+
+def unquote_git_path(path: str) -> str:
+    """
+    Decode a path quoted by git, i.e. a path containing special characters that git prints between double quotes
+    using C-style escapes.
+
+    :param str path: path as printed by git
+    :returns str path
+    """
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+
+    quoted = path[1:-1]
+    unquoted = bytearray()
+    i = 0
+    while i < len(quoted):
+        if quoted[i] == '\\' and i + 1 < len(quoted):
+            if quoted[i + 1] in '01234567':
+                unquoted.append(int(quoted[i + 1:i + 4], 8))
+                i += 4
+            else:
+                unquoted.extend(RAW_ESCAPES.get(quoted[i + 1], quoted[i + 1].encode('utf-8', 'surrogateescape')))
+                i += 2
+        else:
+            unquoted.extend(quoted[i].encode('utf-8', 'surrogateescape'))
+            i += 1
+
+    return unquoted.decode('utf-8', 'surrogateescape')
+
+
+class GitLogIndex(ABC):
+    """
+    Base class of the per-repository indexes built with a single git log over the whole history, at first use.
+    Commits that are not reachable from any ref or reflog entry when the index is built are loaded on demand.
+    """
+
+    def __init__(self, repository_path: str):
+        """
+        :param str repository_path: local path of the Git repository
+        :returns GitLogIndex
+        """
+        self._repository_path = repository_path
+        self.__commits = None
+
+    @property
+    @abstractmethod
+    def log_args(self) -> List[str]:
+        """ Diff options of git log needed by the index """
+        pass
+
+    @abstractmethod
+    def _parse_commit(self, header: List[str], lines: List[str]):
+        """
+        Build the indexed info of a commit.
+
+        :param List[str] header: commit hash, parent hashes and committer date
+        :param List[str] lines: non-empty diff lines of the commit
+        :returns the indexed info of the commit
+        """
+        pass
+
+    def get(self, commit_hash: str):
+        """
+        Get the indexed info of a commit. The index is built at the first call.
+
+        :param str commit_hash: full hash of the commit
+        :returns the indexed info of the commit
+        """
+        if self.__commits is None:
+            self.__commits = dict()
+            self.__load(['--all', '--reflog'])
+            log.info(f'{self.__class__.__name__}: indexed {len(self.__commits)} commits of {self._repository_path}')
+
+        if commit_hash not in self.__commits:
+            # commit not reachable from any ref when the index was built
+            self.__load([commit_hash])
+
+        return self.__commits[commit_hash]
+
+    def __load(self, revs: List[str]):
+        for header, lines in git_log_records(self._repository_path, revs + self.log_args):
+            if header[0] not in self.__commits:
+                self.__commits[header[0]] = self._parse_commit(header, lines)
+
+
+class ChangeSizeIndex(GitLogIndex):
+    """
+    Index of the number of files modified by each commit of a repository (rename detection enabled, merge commits
+    count zero files, as in PyDriller). It answers change size queries without traversing the history for each commit.
+    """
+
+    @property
+    def log_args(self) -> List[str]:
+        return ['--name-only', '-M']
+
+    def _parse_commit(self, header: List[str], lines: List[str]) -> CommitInfo:
+        return CommitInfo(tuple(header[1:-1]), int(header[-1]), len(lines))
+
+    def contiguous_large_commits(self, commit_hash: str, max_change_size: int) -> Set[str]:
+        """
+        Get the contiguous run of commits modifying more than max_change_size files, starting from the given commit
+        and following the history in the same order of 'git rev-list <commit_hash>' (i.e. by committer date, with
+        ties resolved by insertion order). The run ends at the first commit that does not exceed the threshold.
+
+        :param str commit_hash: full hash of the first commit
+        :param int max_change_size: max number of modified files
+        :returns Set[str] the hashes of the commits exceeding the threshold
+        """
+        large_commits = set()
+
+        counter = 0
+        queue = [(-self.get(commit_hash).committed_date, counter, commit_hash)]
+        seen = {commit_hash}
+        while queue:
+            _, _, current = heapq.heappop(queue)
+            commit_info = self.get(current)
+            if commit_info.files_count <= max_change_size:
+                break
+
+            large_commits.add(current)
+            for parent in commit_info.parents:
+                if parent not in seen:
+                    seen.add(parent)
+                    counter += 1
+                    heapq.heappush(queue, (-self.get(parent).committed_date, counter, parent))
+
+        return large_commits
+
+
+class MetaChangeIndex(GitLogIndex):
+    """
+    Index of the meta-changes of each commit of a repository: merge commits, file mode changes and files that are
+    added, deleted or renamed (rename detection enabled). Modified files are not indexed.
+    """
+
+    @property
+    def log_args(self) -> List[str]:
+        # copy detection (-C) is not enabled to keep the same results of PyDriller, which never reports copies
+        return ['--raw', '-M']
+
+    def _parse_commit(self, header: List[str], lines: List[str]) -> MetaChangeInfo:
+        mode_changes = set()
+        change_types = dict()
+        for line in lines:
+            # :<old mode> <new mode> <old sha> <new sha> <status>\t<path>[\t<new path>]
+            if not line.startswith(':'):
+                continue
+            fields = line.split('\t')
+            meta = fields[0].split(' ')
+            paths = [unquote_git_path(p) for p in fields[1:]]
+            old_mode, new_mode, status = meta[0][1:], meta[1], meta[4][0]
+
+            if old_mode != new_mode and int(old_mode) != 0 and int(new_mode) != 0:
+                mode_changes.add(paths[-1])
+
+            change_type = RAW_CHANGE_TYPES.get(status)
+            if change_type:
+                for path in paths:
+                    change_types.setdefault(path, set()).add(change_type)
+
+        return MetaChangeInfo(len(header) > 3, frozenset(mode_changes), change_types)
+
+    def is_merge(self, commit_hash: str) -> bool:
+        """
+        :param str commit_hash: full hash of the commit
+        :returns bool True if the commit has more than one parent
+        """
+        return self.get(commit_hash).merge
+
+    def is_mode_change(self, commit_hash: str, file_path: str) -> bool:
+        """
+        :param str commit_hash: full hash of the commit
+        :param str file_path: path of the file after the commit
+        :returns bool True if the commit changed the mode of the file
+        """
+        return file_path in self.get(commit_hash).mode_changes
+
+    def get_change_types(self, commit_hash: str, file_path: str) -> Set[ModificationType]:
+        """
+        Get the change types of a file in the given commit. Renamed and copied files are matched by both the old
+        and the new path.
+
+        :param str commit_hash: full hash of the commit
+        :param str file_path: path of the file
+        :returns Set[ModificationType] change_types (ADD, DELETE, RENAME or COPY)
+        """
+        return self.get(commit_hash).change_types.get(file_path, set())
+
+
+class LinesChangedIndex(GitLogIndex):
+    """
+    Index of the number of lines changed (added plus deleted) by each commit of a repository, as counted by the
+    LinesCount process metric of PyDriller: rename detection enabled, binary files and merge commits count zero lines.
+    """
+
+    @property
+    def log_args(self) -> List[str]:
+        return ['--numstat', '-M']
+
+    def _parse_commit(self, header: List[str], lines: List[str]) -> int:
+        lines_changed = 0
+        for line in lines:
+            # <added>\t<deleted>\t<path>, where binary files have '-' as added and deleted lines
+            fields = line.split('\t')
+            if len(fields) < 3:
+                continue
+            lines_changed += sum(int(count) for count in fields[:2] if count != '-')
+
+        return lines_changed
+
+    @metrics.stage('lines_count')
+    def lines_changed(self, commit_hash: str) -> int:
+        """
+        :param str commit_hash: full hash of the commit
+        :returns int the number of lines added or deleted by the commit
+        """
+        return self.get(commit_hash)
@@ -0,0 +1,53 @@
+import subprocess
+from collections import namedtuple
+from typing import Iterator, List
+
+from . import metrics
+from .commit_index import unquote_git_path
+
+# a line of the blamed revision: the commit it is attributed to, its path and number in that commit, its number in
+# the blamed revision and its content
+BlameLine = namedtuple('BlameLine', 'commit_hash orig_path orig_line_num final_line_num line')
+
+
+def _is_commit_header(raw_line: bytes) -> bool:
+    # <40-hex sha> <orig line> <final line>[ <lines in group>]
+    return len(raw_line) > 41 and raw_line[40:41] == b' ' and raw_line[:40].isalnum()
+
+
+def blame_lines(repository_path: str, rev: str, file_path: str, blame_args: List[str]) -> Iterator[BlameLine]:
+    """
+    Stream the blame of a file, parsing the output of 'git blame --line-porcelain': it already has the original path,
+    line number and content of each blamed line, so neither a commit object nor the file contents are read.
+
+    :param str repository_path: local path of the Git repository
+    :param str rev: commit revision
+    :param str file_path: path of file to blame
+    :param List[str] blame_args: params of git blame (e.g. ['-w', '-L10,12'])
+    :returns Iterator[BlameLine] the blamed lines, in the order of the blamed revision
+    """
+    cmd = ['git', '-c', 'core.quotePath=false', 'blame', '--line-porcelain'] + blame_args + [rev, '--', file_path]
+    p = subprocess.Popen(cmd, cwd=repository_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    metrics.count_process('git')
+
+    commit_hash = orig_line_num = final_line_num = orig_path = None
+    for raw_line in p.stdout:
+        if raw_line.startswith(b'\t'):
+            # the content line closes the record of each blamed line
+            line = raw_line[1:].decode('utf-8', 'surrogateescape').rstrip('\n')
+            yield BlameLine(commit_hash, orig_path, orig_line_num, final_line_num, line)
+        elif raw_line.startswith(b'filename '):
+            orig_path = raw_line[9:].decode('utf-8', 'surrogateescape').rstrip('\n')
+            if orig_path.startswith('"'):
+                orig_path = unquote_git_path(orig_path)
+        elif _is_commit_header(raw_line):
+            tokens = raw_line.split(b' ')
+            commit_hash = tokens[0].decode('ascii')
+            orig_line_num = int(tokens[1])
+            final_line_num = int(tokens[2])
+
+    stderr = p.stderr.read()
+    p.stdout.close()
+    p.stderr.close()
+    if p.wait() != 0:
+        raise subprocess.CalledProcessError(p.returncode, cmd, stderr=stderr)
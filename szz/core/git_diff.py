@@ -0,0 +1,150 @@
+import subprocess
+from collections import namedtuple
+from typing import Iterator, List, Optional
+
+from . import metrics
+from .commit_index import unquote_git_path
+
+# a file changed by a commit, as reported by the raw output of git diff-tree (paths are None for added/deleted files)
+FileChange = namedtuple('FileChange', 'status old_path new_path')
+# deleted and added line numbers of a file, read from the hunks of git diff-tree
+FileDiff = namedtuple('FileDiff', 'old_path new_path deleted_lines added_lines')
+
+# max number of changed files passed as paths to a single git diff-tree, to stay far below the command line length limit
+MAX_CHANGES_PER_DIFF = 500
+
+
+def _diff_tree(repository_path: str, diff_args: List[str]) -> subprocess.Popen:
+    # plumbing command, so the diff does not depend on the porcelain config of the user (e.g. diff.algorithm),
+    # the same diff that GitPython computes for PyDriller
+    cmd = ['git', '-c', 'core.quotePath=false', '--literal-pathspecs', 'diff-tree', '-r', '-M', '--no-color'] + diff_args
+    p = subprocess.Popen(cmd, cwd=repository_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    metrics.count_process('git')
+    return p
+
+
+def _wait(p: subprocess.Popen, cmd_args: List[str]):
+    stderr = p.stderr.read()
+    p.stdout.close()
+    p.stderr.close()
+    if p.wait() != 0:
+        raise subprocess.CalledProcessError(p.returncode, ['git', 'diff-tree'] + cmd_args, stderr=stderr)
+
+
+def diff_tree_changes(repository_path: str, parent: str, commit: str) -> List[FileChange]:
+    """
+    List the files changed by a commit with respect to the given parent, with rename detection and excluding the
+    added files. Only the raw output of git is read, so the diff of the file contents is never computed.
+
+    :param str repository_path: local path of the Git repository
+    :param str parent: hash of the parent commit
+    :param str commit: hash of the commit
+    :returns List[FileChange] the changed files
+    """
+    args = ['--raw', '-z', '--diff-filter=a', parent, commit]
+    p = _diff_tree(repository_path, args)
+    out = p.stdout.read()
+    _wait(p, args)
+
+    changes = list()
+    fields = out.decode('utf-8', 'surrogateescape').split('\x00')
+    i = 0
+    while i < len(fields) and fields[i].startswith(':'):
+        # :<old mode> <new mode> <old sha> <new sha> <status>, then one path or two paths for renames
+        status = fields[i].split(' ')[4][0]
+        if status in ('R', 'C'):
+            changes.append(FileChange(status, fields[i + 1], fields[i + 2]))
+            i += 3
+        else:
+            path = fields[i + 1]
+            changes.append(FileChange(status, path, None if status == 'D' else path))
+            i += 2
+
+    return changes
+
+
+def _parse_diff_path(path: str, prefix: str) -> Optional[str]:
+    if path.startswith('"'):
+        path = unquote_git_path(path)
+    elif path.endswith('\t'):
+        # git terminates the paths containing spaces with a tab
+        path = path[:-1]
+
+    if path == '/dev/null':
+        return None
+    return path[len(prefix):]
+
+
+def _parse_hunk_header(line: str) -> List[int]:
+    # @@ -<start>[,<count>] +<start>[,<count>] @@, returns the line numbers of the first line of the hunk
+    tokens = line.split(' ')
+    return [int(tokens[1][1:].split(',')[0]), int(tokens[2][1:].split(',')[0])]
+
+
+def diff_tree_hunks(repository_path: str, parent: str, commit: str, changes: List[FileChange] = None) -> Iterator[FileDiff]:
+    """
+    Stream the deleted and added line numbers of the files changed by a commit with respect to the given parent,
+    with rename detection and excluding the added files. The diff has a single context line: without context,
+    git trims the common tail of the files before diffing them, which can align the changes differently from
+    the default diff.
+
+    :param str repository_path: local path of the Git repository
+    :param str parent: hash of the parent commit
+    :param str commit: hash of the commit
+    :param List[FileChange] changes: limit the diff to the given changed files. If None, the diff includes all the
+        files
+    :returns Iterator[FileDiff] the line numbers of each changed file, in the order of git
+    """
+    if changes is None:
+        chunks = [None]
+    else:
+        chunks = [changes[i:i + MAX_CHANGES_PER_DIFF] for i in range(0, len(changes), MAX_CHANGES_PER_DIFF)]
+
+    for chunk in chunks:
+        args = ['-p', '-U1', '--diff-filter=a', '--src-prefix=a/', '--dst-prefix=b/', parent, commit]
+        if chunk is not None:
+            # both paths of a renamed file are needed to detect the rename
+            args.append('--')
+            for change in chunk:
+                args.extend(dict.fromkeys(p for p in (change.old_path, change.new_path) if p))
+
+        p = _diff_tree(repository_path, args)
+        file_diff = None
+        in_header = False
+        line_nums = None
+        for raw_line in p.stdout:
+            if not in_header and file_diff is not None:
+                # content lines are not decoded, only their first character is needed
+                first = raw_line[:1]
+                if first == b' ':
+                    line_nums[0] += 1
+                    line_nums[1] += 1
+                    continue
+                elif first == b'-':
+                    file_diff.deleted_lines.append(line_nums[0])
+                    line_nums[0] += 1
+                    continue
+                elif first == b'+':
+                    file_diff.added_lines.append(line_nums[1])
+                    line_nums[1] += 1
+                    continue
+                elif first == b'\\':
+                    continue
+
+            line = raw_line.decode('utf-8', 'surrogateescape').rstrip('\n')
+            if line.startswith('diff --git '):
+                if file_diff is not None:
+                    yield file_diff
+                file_diff = FileDiff(None, None, list(), list())
+                in_header = True
+            elif line.startswith('@@'):
+                in_header = False
+                line_nums = _parse_hunk_header(line)
+            elif in_header and line.startswith('--- '):
+                file_diff = file_diff._replace(old_path=_parse_diff_path(line[4:], 'a/'))
+            elif in_header and line.startswith('+++ '):
+                file_diff = file_diff._replace(new_path=_parse_diff_path(line[4:], 'b/'))
+
+        if file_diff is not None:
+            yield file_diff
+        _wait(p, args)
@@ -0,0 +1,111 @@
+import functools
+import threading
+from collections import Counter, defaultdict
+from time import perf_counter
+from typing import Callable, Dict
+
+# Counters of the current process: wall time and number of calls of each SZZ stage, and number of processes spawned
+# by kind (git, srcml, jvm). Fix commits are analyzed one at a time in a process, so the metrics of a fix commit are
+# the difference of two snapshots taken before and after it.
+_lock = threading.Lock()
+_stage_time = defaultdict(float)
+_stage_calls = Counter()
+_processes = Counter()
+_active_stages = threading.local()
+
+
+def stage(name: str) -> Callable:
+    """
+    Decorator that records the wall time and the number of calls of a SZZ stage. A call made while the same stage is
+    running in the same thread (e.g. an override calling its base method, or a recursive blame) is part of the
+    outer call. Stages run by concurrent threads sum their time.
+
+    :param str name: name of the stage
+    :returns Callable decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = getattr(_active_stages, 'names', None)
+            if active is None:
+                active = _active_stages.names = set()
+
+            if name in active:
+                return func(*args, **kwargs)
+
+            active.add(name)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                active.discard(name)
+                with _lock:
+                    _stage_time[name] += elapsed
+                    _stage_calls[name] += 1
+        return wrapper
+    return decorator
+
+
+def count_process(kind: str):
+    """
+    Record a spawned process. It is called once the process has started, so the processes that fail to start are
+    not counted.
+
+    :param str kind: kind of process (git, srcml or jvm)
+    """
+    with _lock:
+        _processes[kind] += 1
+
+
+def snapshot() -> Dict[str, dict]:
+    """
+    Get the metrics recorded so far by the current process.
+
+    :returns Dict[str, dict] the wall time and calls of each stage, and the spawned processes of each kind
+    """
+    with _lock:
+        return {
+            'stages': {name: {'calls': _stage_calls[name], 'time_s': _stage_time[name]} for name in _stage_calls},
+            'processes': dict(_processes)
+        }
+
+
+def diff(after: Dict[str, dict], before: Dict[str, dict]) -> Dict[str, dict]:
+    """
+    Get the metrics recorded between two snapshots.
+
+    :param Dict[str, dict] after: the later snapshot
+    :param Dict[str, dict] before: the earlier snapshot
+    :returns Dict[str, dict] the wall time and calls of each stage, and the spawned processes of each kind
+    """
+    stages = dict()
+    for name, metrics in after['stages'].items():
+        prev = before['stages'].get(name, {'calls': 0, 'time_s': 0.0})
+        if metrics['calls'] > prev['calls']:
+            stages[name] = {'calls': metrics['calls'] - prev['calls'], 'time_s': round(metrics['time_s'] - prev['time_s'], 6)}
+
+    processes = dict()
+    for kind, count in after['processes'].items():
+        if count > before['processes'].get(kind, 0):
+            processes[kind] = count - before['processes'].get(kind, 0)
+
+    return {'stages': stages, 'processes': processes}
+
+
+def merge(total: Dict[str, dict], metrics: Dict[str, dict]):
+    """
+    Add the metrics of a fix commit to a total.
+
+    :param Dict[str, dict] total: the total, updated in place
+    :param Dict[str, dict] metrics: the metrics to add
+    """
+    stages = total.setdefault('stages', dict())
+    for name, stage_metrics in metrics['stages'].items():
+        total_stage = stages.setdefault(name, {'calls': 0, 'time_s': 0.0})
+        total_stage['calls'] += stage_metrics['calls']
+        total_stage['time_s'] = round(total_stage['time_s'] + stage_metrics['time_s'], 6)
+
+    processes = total.setdefault('processes', dict())
+    for kind, count in metrics['processes'].items():
+        processes[kind] = processes.get(kind, 0) + count
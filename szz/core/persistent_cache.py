@@ -0,0 +1,114 @@
+import json
+import logging as log
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+CACHE_FILE_NAME = 'pyszz_cache.sqlite'
+
+
+class PersistentCache:
+    """
+    On-disk key-value cache based on SQLite, used to share the results of expensive operations (e.g. comment
+    parsing) across SZZ instances and runs. Values are stored as json and grouped in tables, one for each kind of
+    result. The same cache file can be used by many processes at the same time. The cache is thread-safe.
+    """
+
+    def __init__(self, cache_dir: str):
+        """
+        :param str cache_dir: directory of the cache file. It is created if it does not exist
+        :returns PersistentCache
+        """
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+        self._cache_path = os.path.join(cache_dir, CACHE_FILE_NAME)
+        self.__tables = set()
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(self._cache_path, timeout=60, check_same_thread=False)
+        self.__conn.execute('PRAGMA journal_mode=WAL')
+        self.__conn.execute('PRAGMA synchronous=NORMAL')
+
+    @property
+    def cache_path(self) -> str:
+        """
+         Getter of the path of the cache file.
+
+         :returns str cache_path
+        """
+        return self._cache_path
+
+    def get(self, table: str, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        :param str table: name of the table
+        :param str key: key of the value
+        :returns the cached value or None if the key is not cached
+        """
+        return self.get_many(table, [key]).get(key)
+
+    def get_many(self, table: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Get many cached values with a single query.
+
+        :param str table: name of the table
+        :param Iterable[str] keys: keys of the values
+        :returns Dict[str, Any] the cached values, keys that are not cached are omitted
+        """
+        keys = list(keys)
+        values = dict()
+        with self.__lock:
+            self.__create_table(table)
+            # stay below the default SQLite limit of 999 query parameters
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                query = f'SELECT key, value FROM {table} WHERE key IN ({",".join("?" * len(chunk))})'
+                for key, value in self.__conn.execute(query, chunk):
+                    values[key] = json.loads(value)
+
+        return values
+
+    def put(self, table: str, key: str, value: Any):
+        """
+        Store a value in the cache, replacing the previous one.
+
+        :param str table: name of the table
+        :param str key: key of the value
+        :param value: json serializable value
+        """
+        self.put_many(table, {key: value})
+
+    def put_many(self, table: str, values: Dict[str, Any]):
+        """
+        Store many values in the cache with a single transaction.
+
+        :param str table: name of the table
+        :param Dict[str, Any] values: json serializable values, by key
+        """
+        if not values:
+            return
+
+        with self.__lock:
+            self.__create_table(table)
+            try:
+                with self.__conn:
+                    self.__conn.executemany(f'INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)',
+                                            [(key, json.dumps(value)) for key, value in values.items()])
+            except sqlite3.Error as e:
+                # the cache is an optimization, a failed write must not stop the analysis
+                log.error(f'unable to write cache {self._cache_path}: {e}')
+
+    def close(self):
+        """ Close the connection to the cache file. Calling close() more than once has no effect. """
+        with self.__lock:
+            if self.__conn is not None:
+                self.__conn.close()
+                self.__conn = None
+
+    def __create_table(self, table: str):
+        if table not in self.__tables:
+            with self.__conn:
+                self.__conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self.__tables.add(table)
@@ -2,8 +2,8 @@ import logging as log
 from typing import List, Set
 
 from git import Commit
-from pydriller.metrics.process.lines_count import LinesCount
 from szz.core.abstract_szz import ImpactedFile
+from szz.core.commit_index import LinesChangedIndex
 from szz.ma_szz import MASZZ
 
 
@@ -12,8 +12,21 @@ class LSZZ(MASZZ):
     Large-SZZ implementation.
     """
 
-    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None):
-        super().__init__(repo_full_name, repo_url, repos_dir)
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None, **kwargs):
+        super().__init__(repo_full_name, repo_url, repos_dir, **kwargs)
+        self.__lines_changed_index = None
+
+    @property
+    def lines_changed_index(self) -> LinesChangedIndex:
+        """
+         Getter of the index of the number of lines changed by each commit, built at first use and shared by all
+         the fix commits analyzed with this instance.
+
+         :returns LinesChangedIndex lines_changed_index
+        """
+        if self.__lines_changed_index is None:
+            self.__lines_changed_index = LinesChangedIndex(self.repository_path)
+        return self.__lines_changed_index
 
     # TODO: add parse and type check on kwargs
     def find_bic(self, fix_commit_hash: str, impacted_files: List['ImpactedFile'], **kwargs) -> Set[Commit]:
@@ -33,14 +46,19 @@ class LSZZ(MASZZ):
 
         bic_candidates = super().find_bic(fix_commit_hash=fix_commit_hash, impacted_files=impacted_files, **kwargs)
 
+        return self.select_largest(bic_candidates)
+
+    def select_largest(self, bic_candidates: Set[Commit]) -> Set[Commit]:
+        """
+        Select the bug introducing commit candidate found by MA-SZZ that changed the most lines.
+
+        :param Set[Commit] bic_candidates: bug introducing commits candidates
+        :returns Set[Commit] the largest candidate, or {None} if there are no candidates
+        """
         bic_candidate = None
         max_mod_lines = 0
         for commit in bic_candidates:
-            lc = LinesCount(path_to_repo=self.repository_path, from_commit=commit.hexsha, to_commit=commit.hexsha).count()
-            mod_lines_count = 0
-            for k in lc.keys():
-                mod_lines_count += lc.get(k)
-
+            mod_lines_count = self.lines_changed_index.lines_changed(commit.hexsha)
             if mod_lines_count > max_mod_lines:
                 max_mod_lines = mod_lines_count
                 bic_candidate = commit
@@ -2,10 +2,13 @@ import logging as log
 from typing import List, Set
 from time import time as ts
 from git import Commit
-from pydriller import RepositoryMining, ModificationType
+from pydriller import ModificationType
 
 from szz.ag_szz import AGSZZ
+from szz.core import metrics
 from szz.core.abstract_szz import ImpactedFile, DetectLineMoved
+from szz.core.candidate_filter import CandidateFilterPipeline
+from szz.core.commit_index import MetaChangeIndex
 
 
 class MASZZ(AGSZZ):
@@ -13,52 +16,97 @@ class MASZZ(AGSZZ):
     Meta-Change-Aware-SZZ implementation.
     """
 
-    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None):
-        super().__init__(repo_full_name, repo_url, repos_dir)
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None, **kwargs):
+        super().__init__(repo_full_name, repo_url, repos_dir, **kwargs)
         self.__changes_to_ignore = [
             ModificationType.RENAME,
             ModificationType.COPY
         ]
+        self.__meta_change_index = None
+        # prefetched blames used and discarded so far, over all the fix commits analyzed with this instance
+        self.__prefetched_used = 0
+        self.__prefetched_discarded = 0
+        self.__candidate_filters = CandidateFilterPipeline()
+        # the checks take the instance as argument: closures over self would keep it alive until a garbage collection
+        self.__candidate_filters.register('merge', lambda szz, commit_hash, file_path, **kwargs: szz.get_merge_commits(commit_hash), cost=1.0)
+        self.__candidate_filters.register('meta_change', lambda szz, commit_hash, file_path, **kwargs: szz.get_meta_changes(commit_hash, file_path),
+                                          per_file=True, cost=2.0)
+        self.__candidate_filters.register('change_size', lambda szz, commit_hash, file_path, **kwargs: szz._exclude_commits_by_change_size(commit_hash, **kwargs),
+                                          cost=3.0)
+
+    @property
+    def candidate_filters(self) -> CandidateFilterPipeline:
+        """
+         Getter of the filters of the bug introducing commit candidates (merge commits, meta-changes and large
+         commits). Subclasses can register further filters.
+
+         :returns CandidateFilterPipeline candidate_filters
+        """
+        return self.__candidate_filters
 
     @property
     def change_types_to_ignore(self) -> List[ModificationType]:
+        """
+         Getter of the change types that make a commit a meta-change for a file. Only ADD, DELETE, RENAME and COPY
+         are supported.
+
+         :returns List[ModificationType] change_types_to_ignore
+        """
         return self.__changes_to_ignore
 
     @change_types_to_ignore.setter
     def change_types_to_ignore(self, changes_to_ignore: List[ModificationType]):
         self.__changes_to_ignore = changes_to_ignore
 
-    def _is_git_mode_change(self, git_show_output: List[str], current_file: str):
-        return any(line.strip().startswith('mode change') and current_file in line for line in git_show_output)
+    @property
+    def meta_change_index(self) -> MetaChangeIndex:
+        """
+         Getter of the index of merge commits, file mode changes, renames and copies, built at first use and shared by
+         all the fix commits analyzed with this instance.
+
+         :returns MetaChangeIndex meta_change_index
+        """
+        if self.__meta_change_index is None:
+            self.__meta_change_index = MetaChangeIndex(self.repository_path)
+        return self.__meta_change_index
 
+    @metrics.stage('get_meta_changes')
     def get_meta_changes(self, commit_hash: str, current_file: str) -> Set[str]:
         meta_changes = set()
-        repo_mining = RepositoryMining(path_to_repo=self.repository_path, single=commit_hash).traverse_commits()
-        for commit in repo_mining:
-            show_str = self.repository.git.show(commit.hash, '--summary').splitlines()
-            if show_str and self._is_git_mode_change(show_str, current_file):
-                log.info(f'exclude meta-change (file mode change): {current_file} {commit.hash}')
-                meta_changes.add(commit.hash)
+        try:
+            if self.meta_change_index.is_mode_change(commit_hash, current_file):
+                log.info(f'exclude meta-change (file mode change): {current_file} {commit_hash}')
+                meta_changes.add(commit_hash)
             else:
-                try:
-                    for m in commit.modifications:
-                        if (current_file == m.new_path or current_file == m.old_path) and (m.change_type in self.change_types_to_ignore):
-                            log.info(f'exclude meta-change ({m.change_type}): {current_file} {commit.hash}')
-                            meta_changes.add(commit.hash)
-                except Exception as e:
-                    log.error(f'unable to analyze commit: {self.repository_path} {commit.hash}')
+                for change_type in self.meta_change_index.get_change_types(commit_hash, current_file):
+                    if change_type in self.change_types_to_ignore:
+                        log.info(f'exclude meta-change ({change_type}): {current_file} {commit_hash}')
+                        meta_changes.add(commit_hash)
+        except Exception as e:
+            log.error(f'unable to analyze commit: {self.repository_path} {commit_hash}')
 
         return meta_changes
 
+    def __prefetch_blames(self, impacted_files: List['ImpactedFile'], prefetched_blames: dict, rev: str, **kwargs):
+        ignore_revs = frozenset(kwargs['ignore_revs_list'])
+        to_blame = [f for f in impacted_files if f.file_path not in prefetched_blames]
+        if len(to_blame) < 2:
+            return
+
+        log.info(f'prefetching the blame of {len(to_blame)} files')
+        blame_state = dict()
+        self._ag_annotate(to_blame, blame_state, set(), rev, **kwargs)
+        for file_path, blame_data in blame_state.items():
+            prefetched_blames[file_path] = (ignore_revs, blame_data)
+
+    @metrics.stage('get_merge_commits')
     def get_merge_commits(self, commit_hash: str) -> Set[str]:
         merge = set()
-        repo_mining = RepositoryMining(single=commit_hash, path_to_repo=self.repository_path).traverse_commits()
-        for commit in repo_mining:
-            try:
-                if commit.merge:
-                    merge.add(commit.hash)
-            except Exception as e:
-                log.error(f'unable to analyze commit: {self.repository_path} {commit.hash}')
+        try:
+            if self.meta_change_index.is_merge(commit_hash):
+                merge.add(commit_hash)
+        except Exception as e:
+            log.error(f'unable to analyze commit: {self.repository_path} {commit_hash}')
 
         if len(merge) > 0:
             log.info(f'merge commits count: {len(merge)}')
@@ -76,6 +124,10 @@ class MASZZ(AGSZZ):
             excluded (default 20)
         :key detect_move_from_other_files (DetectLineMoved): Detect lines moved or copied from other files that were
             modified in the same commit, from parent commits or from any commit (default DetectLineMoved.SAME_COMMIT)
+        :key incremental_blame (bool): if true, after the first pass on a file only the lines attributed to the newly
+            ignored commits are blamed again (default False)
+        :key prune_by_issue_date (bool): if true, with the issue date filter, the candidates authored after the issue
+            date are dropped before the candidate filters run (default False)
         :returns Set[Commit] a set of bug introducing commits candidates, represented by Commit object
         """
 
@@ -83,6 +135,7 @@ class MASZZ(AGSZZ):
         self._set_working_tree_to_commit(fix_commit_hash)
 
         max_change_size = kwargs.get('max_change_size', 20)
+        pruning_date = self._pruning_date(**kwargs)
 
         params = dict()
         params['ignore_revs_file_path'] = kwargs.get('ignore_revs_file_path', None)
@@ -95,23 +148,55 @@ class MASZZ(AGSZZ):
         blame_data = list()
         commits_to_ignore = set()
         commits_to_ignore_current_file = set()
-        bic = set()
-        for imp_file in impacted_files:
+        bic_hashes = set()
+        # verdicts of the candidate filters, by filter and commit (and file, for per-file filters)
+        verdicts = dict()
+
+        # the first blame of a file depends on the commits ignored for the previous files. With many blame workers,
+        # once a file has been blamed without changing the ignore list, the next files are blamed at once with the
+        # same list, and each result is used if its file starts with the same list. Once a file starts with a
+        # different list, the prefetched blames are discarded and the files are blamed one at a time until the end
+        # of the fix commit. The next fix commits prefetch only while at least half of the prefetched blames were used
+        prefetch = self._blame_workers > 1 and self.__prefetched_discarded <= self.__prefetched_used
+        prefetched_blames = dict()
+        prev_ignore_revs = None
+        for i, imp_file in enumerate(impacted_files):
+            ignore_revs = frozenset(params['ignore_revs_list'])
+            if prefetch and ignore_revs == prev_ignore_revs and imp_file.file_path not in prefetched_blames:
+                next_files = impacted_files[i:i + self._blame_workers]
+                self.__prefetch_blames(next_files, prefetched_blames, f'{fix_commit_hash}^', **params)
+            prev_ignore_revs = ignore_revs
+
             commits_to_ignore_current_file = commits_to_ignore.copy()
+            blame_state = dict() if kwargs.get('incremental_blame', False) else None
+            commits_to_reblame = set()
 
             to_blame = True
             while to_blame:
                 log.info(f"excluding commits: {params['ignore_revs_list']}")
-                blame_data = self._ag_annotate([imp_file], **params)
+                prefetched = prefetched_blames.pop(imp_file.file_path, None)
+                if prefetched is not None and prefetched[0] == frozenset(params['ignore_revs_list']):
+                    blame_data = prefetched[1]
+                    self.__prefetched_used += 1
+                    if blame_state is not None:
+                        blame_state[imp_file.file_path] = blame_data
+                else:
+                    if prefetched is not None:
+                        prefetch = False
+                        self.__prefetched_discarded += 1 + len(prefetched_blames)
+                        prefetched_blames.clear()
+                    blame_data = self._ag_annotate([imp_file], blame_state, commits_to_reblame, f'{fix_commit_hash}^', **params)
 
                 new_commits_to_ignore = set()
                 new_commits_to_ignore_current_file = set()
                 for bd in blame_data:
-                    if bd.commit.hexsha not in new_commits_to_ignore and bd.commit.hexsha not in new_commits_to_ignore_current_file:
-                        if bd.commit.hexsha not in commits_to_ignore_current_file:
-                            new_commits_to_ignore.update(self._exclude_commits_by_change_size(bd.commit.hexsha, max_change_size=max_change_size))
-                            new_commits_to_ignore.update(self.get_merge_commits(bd.commit.hexsha))
-                            new_commits_to_ignore_current_file.update(self.get_meta_changes(bd.commit.hexsha, bd.file_path))
+                    if bd.commit_hash not in new_commits_to_ignore and bd.commit_hash not in new_commits_to_ignore_current_file:
+                        if bd.commit_hash not in commits_to_ignore_current_file and \
+                                not (pruning_date is not None and self._authored_after(bd.commit_hash, pruning_date)):
+                            to_exclude, to_exclude_current_file = self.candidate_filters.apply(self, bd.commit_hash, bd.file_path, verdicts,
+                                                                                               max_change_size=max_change_size)
+                            new_commits_to_ignore.update(to_exclude)
+                            new_commits_to_ignore_current_file.update(to_exclude_current_file)
 
                 if len(new_commits_to_ignore) == 0 and len(new_commits_to_ignore_current_file) == 0:
                     to_blame = False
@@ -122,10 +207,15 @@ class MASZZ(AGSZZ):
                 commits_to_ignore.update(new_commits_to_ignore)
                 commits_to_ignore_current_file.update(commits_to_ignore)
                 commits_to_ignore_current_file.update(new_commits_to_ignore_current_file)
+                commits_to_reblame = commits_to_ignore_current_file - set(params['ignore_revs_list'])
                 params['ignore_revs_list'] = list(commits_to_ignore_current_file)
 
-            bic.update(set([bd.commit for bd in blame_data if bd.commit.hexsha not in self._exclude_commits_by_change_size(bd.commit.hexsha, max_change_size)]))
-            
+            file_bic_hashes = set([bd.commit_hash for bd in blame_data])
+            if pruning_date is not None:
+                file_bic_hashes = set([commit_hash for commit_hash in file_bic_hashes if not self._authored_after(commit_hash, pruning_date)])
+            bic_hashes.update(set([commit_hash for commit_hash in file_bic_hashes if commit_hash not in self._exclude_commits_by_change_size(commit_hash, max_change_size)]))
+
+        bic = self._get_commits(bic_hashes)
         if 'issue_date_filter' in kwargs and kwargs['issue_date_filter']:
             before = len(bic)
             bic = [c for c in bic if c.authored_date <= kwargs['issue_date']]
@@ -0,0 +1,72 @@
+import logging as log
+from typing import Dict, List, Set
+
+from git import Commit
+
+from szz.ag_szz import AGSZZ
+from szz.b_szz import BaseSZZ
+from szz.core.abstract_szz import ImpactedFile
+from szz.l_szz import LSZZ
+from szz.ma_szz import MASZZ
+from szz.r_szz import RSZZ
+
+
+class MultiSZZ(LSZZ):
+    """
+    Run many SZZ variants on the same repository session. The repository, the impacted files of each fix commit and
+    the commit indexes (change size, meta-changes, lines changed) are shared by all the variants, and R-SZZ and
+    L-SZZ select their result from the candidates of a single MA-SZZ run.
+
+    Supported variants: b, ag, ma, r, l
+    """
+
+    VARIANTS = ['b', 'ag', 'ma', 'r', 'l']
+
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None, variants: List[str] = None, **kwargs):
+        super().__init__(repo_full_name, repo_url, repos_dir, **kwargs)
+        self.__variants = list(variants) if variants else list(self.VARIANTS)
+
+    @property
+    def variants(self) -> List[str]:
+        """
+         Getter of the SZZ variants run on each fix commit.
+
+         :returns List[str] variants
+        """
+        return self.__variants
+
+    def find_bic_variants(self, fix_commit_hash: str, impacted_files: List['ImpactedFile'], **kwargs) -> Dict[str, Set[Commit]]:
+        """
+        Find bug introducing commits candidates with each variant. The kwargs of all the variants can be given at
+        once, each variant ignores the ones it does not support.
+
+        :param str fix_commit_hash: hash of fix commit to scan for buggy commits
+        :param List[ImpactedFile] impacted_files: list of impacted files in fix commit
+        :key ignore_revs_file_path (str): specify ignore revs file for git blame to ignore specific commits.
+        :key max_change_size (int): if the number of modified files exceeds the threshold, the commit will be
+            excluded (default 20)
+        :key detect_move_from_other_files (DetectLineMoved): Detect lines moved or copied from other files that were
+            modified in the same commit, from parent commits or from any commit (default DetectLineMoved.SAME_COMMIT)
+        :key incremental_blame (bool): if true, only the lines attributed to the newly ignored commits are blamed
+            again (default False)
+        :returns Dict[str, Set[Commit]] the bug introducing commits candidates found by each variant
+        """
+        bic = dict()
+        if 'b' in self.variants:
+            log.info('running b-szz')
+            # BaseSZZ only uses the blame of AbstractSZZ, which this instance has
+            bic['b'] = BaseSZZ.find_bic(self, fix_commit_hash, impacted_files, **kwargs)
+        if 'ag' in self.variants:
+            log.info('running ag-szz')
+            bic['ag'] = AGSZZ.find_bic(self, fix_commit_hash, impacted_files, **kwargs)
+        if any(v in self.variants for v in ['ma', 'r', 'l']):
+            log.info('running ma-szz')
+            ma_bic = MASZZ.find_bic(self, fix_commit_hash, impacted_files, **kwargs)
+            if 'ma' in self.variants:
+                bic['ma'] = ma_bic
+            if 'r' in self.variants:
+                bic['r'] = RSZZ.select_most_recent(ma_bic)
+            if 'l' in self.variants:
+                bic['l'] = self.select_largest(ma_bic)
+
+        return {v: bic[v] for v in self.variants}
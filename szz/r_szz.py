@@ -13,13 +13,23 @@ class RSZZ(MASZZ):
     Recent-SZZ implementation.
     """
 
-    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None):
-        super().__init__(repo_full_name, repo_url, repos_dir)
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None, **kwargs):
+        super().__init__(repo_full_name, repo_url, repos_dir, **kwargs)
 
     # TODO: add parse and type check on kwargs
     def find_bic(self, fix_commit_hash: str, impacted_files: List['ImpactedFile'], **kwargs) -> Set[Commit]:
         bic_candidates = super().find_bic(fix_commit_hash, impacted_files, **kwargs)
 
+        return self.select_most_recent(bic_candidates)
+
+    @staticmethod
+    def select_most_recent(bic_candidates: Set[Commit]) -> Set[Commit]:
+        """
+        Select the most recent of the bug introducing commits candidates found by MA-SZZ.
+
+        :param Set[Commit] bic_candidates: bug introducing commits candidates
+        :returns Set[Commit] the most recent candidate, or {None} if there are no candidates
+        """
         latest_bic = None
         if len(bic_candidates) > 0:
             latest_bic = max(bic_candidates, key=attrgetter('committed_date'))
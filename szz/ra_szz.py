@@ -1,13 +1,20 @@
 import json
 import logging as log
 import os
+import subprocess
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Set
 
+from git import Commit
 from options import Options
+from szz.core import metrics
 from szz.ma_szz import MASZZ
 from szz.core.abstract_szz import ImpactedFile, BlameData, DetectLineMoved
 
+DEFAULT_REFACTORING_MINER_WORKERS = 1
+
 
 class RASZZ(MASZZ):
     """
@@ -22,21 +29,104 @@ class RASZZ(MASZZ):
     todo:
     """
 
-    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None):
-        super().__init__(repo_full_name, repo_url, repos_dir)
+    # Refactoring Miner opens the .git folder of the repository
+    _bare_repository_supported = False
+
+    def __init__(self, repo_full_name: str, repo_url: str, repos_dir: str = None,
+                 refactoring_miner_workers: int = DEFAULT_REFACTORING_MINER_WORKERS, **kwargs):
+        """
+        :param int refactoring_miner_workers: max number of Refactoring Miner processes running at the same time. Each
+            process is a JVM with its own heap (default 1)
+        """
+        self.__refactoring_miner_pool = None
+        super().__init__(repo_full_name, repo_url, repos_dir, **kwargs)
+        self.__refactorings = dict()
+        self.__pending_refactorings = dict()
+        self.__refactorings_lock = threading.Lock()
+        self.__refactoring_miner_workers = max(1, refactoring_miner_workers)
+        self.__pruning_date = None
+
+    @property
+    def refactoring_miner_pool(self) -> ThreadPoolExecutor:
+        """
+         Getter of the bounded pool running Refactoring Miner, created at first use.
+
+         :returns ThreadPoolExecutor refactoring_miner_pool
+        """
+        if self.__refactoring_miner_pool is None:
+            self.__refactoring_miner_pool = ThreadPoolExecutor(max_workers=self.__refactoring_miner_workers)
+        return self.__refactoring_miner_pool
+
+    def close(self):
+        if self.__refactoring_miner_pool is not None:
+            self.__refactoring_miner_pool.shutdown(wait=True)
+            self.__refactoring_miner_pool = None
+        super().close()
 
+    @metrics.stage('extract_refactorings')
     def _extract_refactorings(self, commits):
-        PATH_TO_REFMINER = os.path.join(Options.PYSZZ_HOME, 'tools/RefactoringMiner-2.0/bin/RefactoringMiner')
+        """
+        Get the output of Refactoring Miner for each of the given commits. Results are kept for the whole life of the
+        instance and, if the persistent cache is available, stored on disk by repository and commit hash, so Refactoring
+        Miner runs only for the commits that have never been analyzed. Refactoring Miner still runs once per missing
+        commit, but up to refactoring_miner_workers runs can be concurrent.
 
-        refactorings = dict()
-        for commit in commits:
-            if not commit in refactorings:
-                with tempfile.NamedTemporaryFile(mode='r+') as tmpfile:
-                    log.info(f'Running RefMiner on {commit}')
-                    os.system(f'"{PATH_TO_REFMINER}" -c "{self._repository_path}" {commit} > {tmpfile.name}')
-                    refactorings[commit] = json.loads(tmpfile.read())
+        :param commits: hashes of the commits to analyze
+        :returns dict the parsed Refactoring Miner json, by commit hash
+        """
+        with self.__refactorings_lock:
+            to_extract = [commit for commit in dict.fromkeys(commits) if commit not in self.__refactorings and commit not in self.__pending_refactorings]
+            if to_extract and self._cache:
+                cached = self._cache.get_many('refactorings', [self.__refactorings_key(commit) for commit in to_extract])
+                for commit in to_extract:
+                    if self.__refactorings_key(commit) in cached:
+                        self.__refactorings[commit] = cached[self.__refactorings_key(commit)]
+                to_extract = [commit for commit in to_extract if commit not in self.__refactorings]
 
-        return refactorings
+            for commit in to_extract:
+                self.__pending_refactorings[commit] = self.refactoring_miner_pool.submit(self.__run_refactoring_miner, commit)
+            # the commits submitted by concurrent blames are not submitted again, their results are awaited
+            futures = {commit: self.__pending_refactorings[commit] for commit in dict.fromkeys(commits) if commit in self.__pending_refactorings}
+
+        extracted = dict()
+        error = None
+        for commit, future in futures.items():
+            try:
+                result = future.result()
+                with self.__refactorings_lock:
+                    self.__refactorings[commit] = result
+                    self.__pending_refactorings.pop(commit, None)
+                if commit in to_extract:
+                    extracted[self.__refactorings_key(commit)] = result
+            except Exception as e:
+                with self.__refactorings_lock:
+                    self.__pending_refactorings.pop(commit, None)
+                error = error or e
+
+        # the results of the successful runs are kept even if another run failed
+        if self._cache:
+            self._cache.put_many('refactorings', extracted)
+        if error is not None:
+            raise error
+
+        return {commit: self.__refactorings[commit] for commit in commits}
+
+    def __refactorings_key(self, commit: str) -> str:
+        return f'{self._repo_full_name}@{commit}'
+
+    def __run_refactoring_miner(self, commit: str) -> dict:
+        PATH_TO_REFMINER = os.path.join(Options.PYSZZ_HOME, 'tools/RefactoringMiner-2.0/bin/RefactoringMiner')
+
+        with tempfile.NamedTemporaryFile(mode='r+') as tmpfile:
+            log.info(f'Running RefMiner on {commit}')
+            cmd = [PATH_TO_REFMINER, '-c', self._repository_path, commit]
+            p = subprocess.Popen(cmd, stdout=tmpfile)
+            metrics.count_process('jvm')
+            # a failed run raises, so its output is neither kept nor stored in the persistent cache
+            if p.wait() != 0:
+                raise subprocess.CalledProcessError(p.returncode, cmd)
+            tmpfile.seek(0)
+            return json.loads(tmpfile.read())
 
     def __read_refactorings_for_commit(self, fix_commit_hash, fix_refactorings):
         refactorings = list()
@@ -48,6 +138,15 @@ class RASZZ(MASZZ):
 
         return refactorings
 
+    def find_bic(self, fix_commit_hash: str, impacted_files: List['ImpactedFile'], **kwargs) -> Set[Commit]:
+        # refactorings are not extracted for the candidates that are pruned by issue date
+        self.__pruning_date = self._pruning_date(**kwargs)
+        try:
+            return super().find_bic(fix_commit_hash, impacted_files, **kwargs)
+        finally:
+            self.__pruning_date = None
+
+    @metrics.stage('get_impacted_files')
     def get_impacted_files(self, fix_commit_hash: str,
                            file_ext_to_parse: List[str] = None,
                            only_deleted_lines: bool = True) -> List['ImpactedFile']:
@@ -66,11 +165,12 @@ class RASZZ(MASZZ):
                         if file_path == f.file_path and modified_line >= from_line and modified_line <= to_line:
                             log.info(f'Ignoring {f.file_path} line {modified_line} (refactoring {refactoring["type"]})')
                             lines_to_remove.add(modified_line)
-                    f.modified_lines = set([line for line in f.modified_lines if not line in lines_to_remove])
+                    f.modified_lines = [line for line in f.modified_lines if not line in lines_to_remove]
 
         impacted_files = [f for f in impacted_files if len(f.modified_lines) > 0]
         return impacted_files
 
+    @metrics.stage('blame')
     def _blame(self,
                rev: str,
                file_path: str,
@@ -96,26 +196,29 @@ class RASZZ(MASZZ):
             detect_move_from_other_files
         )
 
-        commits = set([blame.commit.hexsha for blame in candidate_blame_data])
+        commits = set([blame.commit_hash for blame in candidate_blame_data])
+        if self.__pruning_date is not None:
+            commits = set([commit for commit in commits if not self._authored_after(commit, self.__pruning_date)])
         refactorings = self._extract_refactorings(commits)
 
         to_reblame = dict()
         result_blame_data = set()
         for blame in candidate_blame_data:
             can_add = True
-            for refactoring in self.__read_refactorings_for_commit(blame.commit.hexsha, refactorings):
+            for refactoring in self.__read_refactorings_for_commit(blame.commit_hash, refactorings):
                 for location in refactoring['rightSideLocations']:
                     file_path = location['filePath']
                     from_line = location['startLine']
                     to_line   = location['endLine']
 
-                    if blame.file_path == file_path and blame.line_num >= from_line and blame.line_num <= to_line and blame.commit.hexsha not in ignore_revs_list:
+                    if blame.file_path == file_path and blame.line_num >= from_line and blame.line_num <= to_line and blame.commit_hash not in ignore_revs_list:
                         log.info(f'Ignoring {blame.file_path} line {blame.line_num} (refactoring {refactoring["type"]})')
-                        commit_key = blame.commit.hexsha + "@" + blame.file_path
+                        commit_key = blame.commit_hash + "@" + blame.file_path
                         if not commit_key in to_reblame:
-                            to_reblame[commit_key] = ReblameCandidate(blame.commit.hexsha, blame.file_path, set([blame.line_num]))
+                            to_reblame[commit_key] = ReblameCandidate(blame.commit_hash, blame.file_path, set([blame.line_num]))
                         else:
                             to_reblame[commit_key].modified_lines.add(blame.line_num)
+                        to_reblame[commit_key].final_line_nums.setdefault(blame.line_num, set()).update(blame.final_line_nums)
                         can_add = False
 
             if can_add:
@@ -139,7 +242,11 @@ class RASZZ(MASZZ):
                 detect_move_from_other_files
             )
 
-            result_blame_data.update(new_blame_results)
+            # the re-blamed lines are numbered as in the refactoring commit, map them back to the lines of rev
+            for new_blame in new_blame_results:
+                new_blame.final_line_nums = set().union(*[reblame_candidate.final_line_nums.get(line_num, set()) for line_num in new_blame.final_line_nums])
+
+            result_blame_data = self._merge_blame_data(result_blame_data, new_blame_results)
 
         return result_blame_data
 
@@ -148,4 +255,6 @@ class ReblameCandidate:
     def __init__(self, rev, file_path, modified_lines: Set):
         self.rev = rev
         self.file_path = file_path
-        self.modified_lines = modified_lines
\ No newline at end of file
+        self.modified_lines = modified_lines
+        # lines of the blamed revision attributed to each modified line
+        self.final_line_nums = dict()
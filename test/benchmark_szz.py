@@ -0,0 +1,313 @@
+"""
+Scaling benchmark of the SZZ implementations on synthetic repositories.
+
+The repositories are generated offline with git fast-import, with a configurable history depth, number and size of
+files, size of the fix commits, number of renames and density of large commits. Each SZZ variant runs on each
+repository in its own process, and the report has its wall time, the number of git processes it spawned and its
+peak RSS.
+
+USAGE: python test/benchmark_szz.py [--variants b,ag,ma,r,l,ra] [--set PARAM=VALUE ...] [--sweep PARAM=V1,V2,...]
+                                    [--conf-set KEY=VALUE ...] [--work-dir DIR] [--out REPORT_JSON]
+
+e.g. python test/benchmark_szz.py --sweep history_depth=200,1000,5000 --set files=50
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import Counter, namedtuple
+from time import perf_counter
+from typing import Dict, List
+
+import yaml
+
+PYSZZ_HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYSZZ_HOME)
+
+VARIANTS = ['b', 'ag', 'ma', 'r', 'l', 'ra']
+
+# parameters of a synthetic repository:
+# * history_depth: number of commits before the fix commits
+# * files: number of source files
+# * file_lines: initial number of lines of each file
+# * fix_lines: number of lines modified by each fix commit, spread over up to 3 files
+# * fixes: number of fix commits, at the end of the history
+# * renames: number of commits that only rename a file
+# * large_commit_density: fraction of the commits that modify LARGE_COMMIT_FILES files (e.g. reformatting commits)
+# * file_ext: extension of the source files, which selects the comment parser
+# * seed: seed of the random generator, the same parameters always generate the same repository
+RepoParams = namedtuple('RepoParams', 'history_depth files file_lines fix_lines fixes renames large_commit_density file_ext seed')
+DEFAULT_PARAMS = RepoParams(history_depth=500, files=30, file_lines=300, fix_lines=10, fixes=5, renames=5,
+                            large_commit_density=0.02, file_ext='java', seed=42)
+
+# files modified by a large commit, more than the default max_change_size of AG-SZZ and MA-SZZ
+LARGE_COMMIT_FILES = 40
+# lines modified by each file of a regular commit
+LINES_PER_FILE_CHANGE = 5
+
+GIT_SHIM = """#!/bin/sh
+echo "$*" >> "$SZZ_BENCH_GIT_LOG"
+exec "{git}" "$@"
+"""
+
+
+def parse_params(assignments: List[str], params: RepoParams) -> RepoParams:
+    values = dict()
+    for assignment in assignments:
+        key, value = assignment.split('=', 1)
+        if key not in RepoParams._fields:
+            raise ValueError(f'unknown repository parameter: {key}')
+        values[key] = type(getattr(DEFAULT_PARAMS, key))(value)
+
+    return params._replace(**values)
+
+
+def scale_point_name(params: RepoParams) -> str:
+    return (f'd{params.history_depth}_f{params.files}_s{params.file_lines}_x{params.fix_lines}'
+            f'_r{params.renames}_l{params.large_commit_density}_{params.file_ext}')
+
+
+def _line(rng: random.Random, file_id: int, commit_id: int) -> str:
+    return f'    int value_{file_id}_{rng.randrange(10 ** 6)} = compute({commit_id}, {rng.randrange(10 ** 3)});'
+
+
+def generate_repo(repo_path: str, params: RepoParams) -> List[str]:
+    """
+    Generate a synthetic repository with git fast-import.
+
+    :param str repo_path: path of the new repository
+    :param RepoParams params: parameters of the repository
+    :returns List[str] hashes of the fix commits
+    """
+    rng = random.Random(params.seed)
+    subprocess.run(['git', 'init', '-q', repo_path], check=True)
+    branch = subprocess.run(['git', 'symbolic-ref', 'HEAD'], cwd=repo_path, check=True,
+                            stdout=subprocess.PIPE).stdout.decode().strip()
+
+    contents = dict()
+    for file_id in range(params.files):
+        path = f'src/pkg{file_id % 10}/File{file_id}.{params.file_ext}'
+        contents[path] = [_line(rng, file_id, 0) for _ in range(params.file_lines)]
+    file_ids = {path: file_id for file_id, path in enumerate(contents)}
+
+    depth = max(params.history_depth, 1)
+    rename_commits = set(rng.sample(range(1, depth), min(params.renames, depth - 1)))
+    fix_commits = list(range(depth + 1, depth + 1 + params.fixes))
+
+    marks_file = os.path.join(repo_path, '.git', 'marks')
+    p = subprocess.Popen(['git', 'fast-import', '--quiet', f'--export-marks={marks_file}'], cwd=repo_path, stdin=subprocess.PIPE)
+
+    def write_data(data: str):
+        raw = data.encode()
+        p.stdin.write(f'data {len(raw)}\n'.encode() + raw + b'\n')
+
+    def modify_lines(commit_id: int, path: str, count: int):
+        lines = contents[path]
+        for line_num in rng.sample(range(len(lines)), min(count, len(lines))):
+            lines[line_num] = _line(rng, file_ids[path], commit_id)
+        # regular changes also add some lines, so line numbers shift along the history
+        if rng.random() < 0.3:
+            lines.insert(rng.randrange(len(lines) + 1), _line(rng, file_ids[path], commit_id))
+
+    for commit_id in range(1, depth + 1 + params.fixes):
+        renamed = None
+        if commit_id == 1:
+            changed = list(contents)
+        elif commit_id in rename_commits:
+            old_path = rng.choice(list(contents))
+            new_path = old_path.replace('/File', '/Renamed', 1) if '/File' in old_path else old_path + '.moved'
+            contents[new_path] = contents.pop(old_path)
+            file_ids[new_path] = file_ids[old_path]
+            renamed = (old_path, new_path)
+            changed = list()
+        elif commit_id in fix_commits:
+            changed = rng.sample(list(contents), min(3, len(contents)))
+            for i, path in enumerate(changed):
+                modify_lines(commit_id, path, params.fix_lines // len(changed) + (1 if i < params.fix_lines % len(changed) else 0))
+        elif rng.random() < params.large_commit_density:
+            changed = rng.sample(list(contents), min(LARGE_COMMIT_FILES, len(contents)))
+            for path in changed:
+                modify_lines(commit_id, path, 1)
+        else:
+            changed = rng.sample(list(contents), min(rng.randint(1, 3), len(contents)))
+            for path in changed:
+                modify_lines(commit_id, path, LINES_PER_FILE_CHANGE)
+
+        timestamp = 1500000000 + commit_id * 3600
+        p.stdin.write(f'commit {branch}\nmark :{commit_id}\n'
+                      f'author Dev <dev@example.com> {timestamp} +0000\n'
+                      f'committer Dev <dev@example.com> {timestamp} +0000\n'.encode())
+        write_data('fix bug' if commit_id in fix_commits else f'commit {commit_id}')
+        if commit_id > 1:
+            p.stdin.write(f'from :{commit_id - 1}\n'.encode())
+        if renamed:
+            p.stdin.write(f'R {renamed[0]} {renamed[1]}\n'.encode())
+        for path in changed:
+            p.stdin.write(f'M 100644 inline {path}\n'.encode())
+            write_data('\n'.join(contents[path]) + '\n')
+
+    p.stdin.close()
+    if p.wait() != 0:
+        raise RuntimeError(f'git fast-import failed for {repo_path}')
+
+    subprocess.run(['git', 'reset', '-q', '--hard'], cwd=repo_path, check=True)
+    marks = dict()
+    with open(marks_file) as f:
+        for line in f:
+            mark, commit_hash = line.split()
+            marks[int(mark[1:])] = commit_hash
+    os.remove(marks_file)
+
+    return [marks[commit_id] for commit_id in fix_commits]
+
+
+def run_variant(variant: str, repo_name: str, repos_dir: str, input_json: str, conf_overrides: Dict) -> dict:
+    """
+    Run a SZZ variant on all the fix commits of a synthetic repository, in the current process. It is the body of
+    the process spawned by measure().
+    """
+    import main as pyszz
+    with open(os.path.join(PYSZZ_HOME, 'conf', f'{variant}szz.yml')) as f:
+        conf = yaml.safe_load(f)
+    conf.update(conf_overrides)
+    with open(input_json) as f:
+        commits = json.load(f)
+
+    error = None
+    start = perf_counter()
+    try:
+        pyszz.process_repo(repo_name, list(enumerate(commits)), conf, repos_dir, len(commits))
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    wall_time = perf_counter() - start
+
+    return {
+        'wall_time_s': round(wall_time, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'error': error
+    }
+
+
+def measure(variant: str, repo_name: str, repos_dir: str, input_json: str, conf_overrides: Dict, work_dir: str,
+            shim_dir: str) -> dict:
+    """
+    Run a SZZ variant in a new process, with a git shim that logs each git process.
+    """
+    git_log = os.path.join(work_dir, 'git.log')
+    if os.path.exists(git_log):
+        os.remove(git_log)
+
+    env = dict(os.environ)
+    env['PATH'] = shim_dir + os.pathsep + env.get('PATH', '')
+    env['SZZ_BENCH_GIT_LOG'] = git_log
+    run_log = os.path.join(work_dir, f'{repo_name.replace("/", "_")}_{variant}.log')
+    with open(run_log, 'w') as log_file:
+        p = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', variant, repo_name, repos_dir, input_json,
+                            json.dumps(conf_overrides)], cwd=work_dir, env=env, stdout=subprocess.PIPE, stderr=log_file)
+    if p.returncode != 0:
+        return {'error': f'exit code {p.returncode}, see {run_log}'}
+
+    result = json.loads(p.stdout.decode().strip().split('\n')[-1])
+    git_commands = Counter()
+    if os.path.exists(git_log):
+        with open(git_log) as f:
+            for line in f:
+                git_commands[_git_command(line.split())] += 1
+    result['git_processes'] = sum(git_commands.values())
+    result['git_commands'] = dict(git_commands.most_common())
+
+    return result
+
+
+def _git_command(args: List[str]) -> str:
+    # skip the global options of git, e.g. git -c core.quotePath=false blame ...
+    i = 0
+    while i < len(args) and args[i].startswith('-'):
+        i += 2 if args[i] in ('-c', '-C') else 1
+    return args[i] if i < len(args) else ''
+
+
+def print_report(report: List[dict]):
+    print(f'{"scale point":<45} {"variant":<8} {"wall (s)":>9} {"git procs":>10} {"rss (MB)":>9}')
+    for r in report:
+        if r.get('error'):
+            print(f'{r["scale_point"]:<45} {r["variant"]:<8} ERROR {r["error"]}')
+        else:
+            print(f'{r["scale_point"]:<45} {r["variant"]:<8} {r["wall_time_s"]:>9} {r["git_processes"]:>10} {r["peak_rss_mb"]:>9}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling benchmark of the SZZ implementations on synthetic repositories.')
+    parser.add_argument('--variants', default=','.join(VARIANTS), help='comma separated SZZ variants to run (default all)')
+    parser.add_argument('--set', action='append', default=[], metavar='PARAM=VALUE',
+                        help=f'set a repository parameter of all the scale points ({", ".join(RepoParams._fields)})')
+    parser.add_argument('--sweep', default=None, metavar='PARAM=V1,V2,...',
+                        help='generate a scale point for each value of a repository parameter')
+    parser.add_argument('--conf-set', action='append', default=[], metavar='KEY=VALUE',
+                        help='override a key of the configuration files of the variants (e.g. checkout_free=true)')
+    parser.add_argument('--work-dir', default=None, help='directory of the repositories and logs (default: a temp dir)')
+    parser.add_argument('--out', default='benchmark_report.json', help='path of the json report')
+    parser.add_argument('--run-one', nargs=5, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        variant, repo_name, repos_dir, input_json, conf_overrides = args.run_one
+        print(json.dumps(run_variant(variant, repo_name, repos_dir, input_json, json.loads(conf_overrides))))
+        return
+
+    variants = args.variants.split(',')
+    for variant in variants:
+        if variant not in VARIANTS:
+            parser.error(f'unknown variant: {variant}')
+    if 'ra' in variants and not shutil.which('java'):
+        print('java not found, RA-SZZ is skipped', file=sys.stderr)
+        variants.remove('ra')
+
+    base_params = parse_params(args.set, DEFAULT_PARAMS)
+    scale_points = [base_params]
+    if args.sweep:
+        key, values = args.sweep.split('=', 1)
+        scale_points = [parse_params([f'{key}={value}'], base_params) for value in values.split(',')]
+    conf_overrides = {key: yaml.safe_load(value) for key, value in (kv.split('=', 1) for kv in args.conf_set)}
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix='szz_bench_'))
+    repos_dir = os.path.join(work_dir, 'repos')
+    shim_dir = os.path.join(work_dir, 'bin')
+    os.makedirs(shim_dir, exist_ok=True)
+    with open(os.path.join(shim_dir, 'git'), 'w') as f:
+        f.write(GIT_SHIM.format(git=shutil.which('git')))
+    os.chmod(os.path.join(shim_dir, 'git'), 0o755)
+
+    report = list()
+    for params in scale_points:
+        name = scale_point_name(params)
+        repo_name = f'bench/{name}'
+        repo_path = os.path.join(repos_dir, repo_name)
+        if os.path.isdir(repo_path):
+            shutil.rmtree(repo_path)
+        start = perf_counter()
+        fix_commits = generate_repo(repo_path, params)
+        print(f'generated {repo_name} in {perf_counter() - start:.1f}s', file=sys.stderr)
+
+        input_json = os.path.join(work_dir, f'{name}.json')
+        with open(input_json, 'w') as f:
+            json.dump([{'repo_name': repo_name, 'fix_commit_hash': h, 'earliest_issue_date': '2100-01-01T00:00:00'}
+                       for h in fix_commits], f)
+
+        for variant in variants:
+            result = measure(variant, repo_name, repos_dir, input_json, conf_overrides, work_dir, shim_dir)
+            report.append({'scale_point': name, **params._asdict(), 'variant': variant, 'fix_commits': len(fix_commits), **result})
+            print(f'{name} {variant}: {result}', file=sys.stderr)
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
+from io import BytesIO
+
 from szz.core.abstract_szz import AbstractSZZ, ImpactedFile
-from szz.core.comment_parser import parse_comments
+from szz.core.comment_parser import CommentRange, parse_comments, parse_comments_batch, _is_line_start, _parse_srcml_comments
 
 
 """ test python comment parser """
@@ -80,3 +82,92 @@ assert len(comments) == len(comment_ranges)
 for comment_range, oracle in zip(comment_ranges, comments):
     print(comment_range)
     assert comment_range.start == oracle[0] and comment_range.end == oracle[1]
+
+
+""" test batch comment parser """
+source_files = list()
+for source_file_name in ['test.py', 'test.js', 'test.php', 'test.rb']:
+    with open(source_file_name) as f:
+        source_files.append((source_file_name, f.read()))
+
+batch_comment_ranges = parse_comments_batch(source_files)
+
+assert len(batch_comment_ranges) == len(source_files)
+for (source_file_name, source_file_content), comment_ranges in zip(source_files, batch_comment_ranges):
+    print(source_file_name, comment_ranges)
+    assert comment_ranges == parse_comments(source_file_content, source_file_name)
+
+
+""" test srcML output parser, on a canned srcML archive """
+
+c_source = '\n'.join([
+    '/* license */',
+    '#include <stdio.h>',
+    'int main() { // trailing',
+    '\t// tab indented',
+    '\treturn 0; /* trailing block */',
+    '\t/* multi',
+    '\t   line */',
+    '}'
+])
+java_source = '\n'.join([
+    '// first line',
+    'class B {',
+    '    int x; // trailing',
+    '    /** doc',
+    '     */',
+    '    void f() {}',
+    '}'
+])
+srcml_archive = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<unit xmlns="http://www.srcML.org/srcML/src" xmlns:pos="http://www.srcML.org/srcML/position" revision="1.0.0" pos:tabs="8">
+
+<unit xmlns:cpp="http://www.srcML.org/srcML/cpp" revision="1.0.0" language="C" filename="/tmp/srcml_x/0_a.c" pos:tabs="8"><comment type="block" pos:start="1:1" pos:end="1:13">/* license */</comment>
+<cpp:include pos:start="2:1" pos:end="2:18">#<cpp:directive pos:start="2:2" pos:end="2:8">include</cpp:directive> <cpp:file pos:start="2:10" pos:end="2:18">&lt;stdio.h&gt;</cpp:file></cpp:include>
+<function pos:start="3:1" pos:end="8:1"><type pos:start="3:1" pos:end="3:3"><name pos:start="3:1" pos:end="3:3">int</name></type> <name pos:start="3:5" pos:end="3:8">main</name><parameter_list pos:start="3:9" pos:end="3:10">()</parameter_list> <block pos:start="3:12" pos:end="8:1">{<block_content pos:start="3:14" pos:end="7:12"> <comment type="line" pos:start="3:14" pos:end="3:24">// trailing</comment>
+	<comment type="line" pos:start="4:9" pos:end="4:23">// tab indented</comment>
+	<return pos:start="5:9" pos:end="5:17">return <expr pos:start="5:16" pos:end="5:16"><literal type="number" pos:start="5:16" pos:end="5:16">0</literal></expr>;</return> <comment type="block" pos:start="5:19" pos:end="5:38">/* trailing block */</comment>
+	<comment type="block" pos:start="6:9" pos:end="7:18">/* multi
+	   line */</comment>
+</block_content>}</block></function>
+</unit>
+
+<unit revision="1.0.0" language="Java" filename="/tmp/srcml_x/1_B.java" pos:tabs="8"><comment type="line" pos:start="1:1" pos:end="1:13">// first line</comment>
+<class pos:start="2:1" pos:end="7:1">class <name pos:start="2:7" pos:end="2:7">B</name> <block pos:start="2:9" pos:end="7:1">{
+    <decl_stmt pos:start="3:5" pos:end="3:10"><decl pos:start="3:5" pos:end="3:9"><type pos:start="3:5" pos:end="3:7"><name pos:start="3:5" pos:end="3:7">int</name></type> <name pos:start="3:9" pos:end="3:9">x</name></decl>;</decl_stmt> <comment type="line" pos:start="3:12" pos:end="3:22">// trailing</comment>
+    <comment type="javadoc" pos:start="4:5" pos:end="5:7">/** doc
+     */</comment>
+    <function pos:start="6:5" pos:end="6:15"><type pos:start="6:5" pos:end="6:8"><name pos:start="6:5" pos:end="6:8">void</name></type> <name pos:start="6:10" pos:end="6:10">f</name><parameter_list pos:start="6:11" pos:end="6:12">()</parameter_list> <block pos:start="6:14" pos:end="6:15">{<block_content/>}</block></function>
+}</block></class>
+</unit>
+
+</unit>
+'''
+file_paths = {'/tmp/srcml_x/0_a.c': 0, '/tmp/srcml_x/1_B.java': 1}
+comments = [list(), list()]
+_parse_srcml_comments(BytesIO(srcml_archive), file_paths, comments)
+
+# comment (start line, start column, end line), trailing comments included
+assert comments[0] == [(1, 1, 1), (3, 14, 3), (4, 9, 4), (5, 19, 5), (6, 9, 7)]
+assert comments[1] == [(1, 1, 1), (3, 12, 3), (4, 5, 5)]
+
+# only the comments starting a line are kept, as in _run_srcml
+for source, file_comments, oracle in [(c_source, comments[0], [[1, 1], [4, 4], [6, 7]]),
+                                      (java_source, comments[1], [[1, 1], [4, 5]])]:
+    lines = source.split('\n')
+    comment_ranges = [CommentRange(start=start, end=end) for start, column, end in file_comments if _is_line_start(lines, start, column)]
+    print(comment_ranges)
+    assert [[r.start, r.end] for r in comment_ranges] == oracle
+
+assert _is_line_start(['\t// tab indented'], 1, 9)
+assert not _is_line_start(['\treturn 0; /* trailing block */'], 1, 19)
+assert not _is_line_start(['// line'], 2, 1)
+
+# a single file is a srcML unit without archive
+srcml_unit = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<unit xmlns="http://www.srcML.org/srcML/src" xmlns:pos="http://www.srcML.org/srcML/position" revision="1.0.0" language="Java" filename="/tmp/srcml_x/0_B.java" pos:tabs="8"><comment type="line" pos:start="1:1" pos:end="1:13">// first line</comment>
+</unit>
+'''
+comments = [list()]
+_parse_srcml_comments(BytesIO(srcml_unit), {'/tmp/srcml_x/0_B.java': 0}, comments)
+assert comments[0] == [(1, 1, 1)]
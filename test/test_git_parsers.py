@@ -0,0 +1,263 @@
+"""
+Regression test of the parsers of the git output: impacted files (git diff-tree), change sizes, meta-changes and
+changed lines (git log) and blamed lines (git blame --line-porcelain). They are computed on a fixture repository
+with edge cases (quoted, spaced and unicode paths, binary files, symlinks, missing final newline, renames across
+extensions, mode changes, merges) and checked against an oracle and against the PyDriller and GitPython
+implementations that they replace.
+
+USAGE: python test/test_git_parsers.py (from the root of the project)
+"""
+import logging as log
+import os
+import subprocess
+import sys
+import tempfile
+from shutil import rmtree
+from typing import Dict, List
+
+from git import Repo
+from pydriller import GitRepository, ModificationType, RepositoryMining
+from pydriller.metrics.process.lines_count import LinesCount
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from szz.b_szz import BaseSZZ
+from szz.core.commit_index import ChangeSizeIndex, LinesChangedIndex, MetaChangeIndex, unquote_git_path
+from szz.core.git_blame import blame_lines
+
+log.basicConfig(level=log.WARNING, format='%(asctime)s :: %(levelname)s :: %(message)s')
+
+REPO_NAME = 'fixture/repo'
+SPACED = 'src/space name.py'
+UNICODE = 'src/ünï côdé.py'
+QUOTED = 'src/quo"te.py'
+NO_EOL = 'src/no_eol.py'
+LARGE_FILES = [f'src/f{i:02d}.py' for i in range(22)]
+
+
+def git(repo_path: str, *args, env: dict = None) -> str:
+    return subprocess.run(['git'] + list(args), cwd=repo_path, env=env, check=True, stdout=subprocess.PIPE).stdout.decode('utf-8')
+
+
+def write(repo_path: str, file_path: str, content, mode: str = 'w'):
+    path = os.path.join(repo_path, file_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as f:
+        f.write(content)
+
+
+def lines(name: str, count: int = 10, changed: Dict[int, str] = None) -> str:
+    changed = changed or dict()
+    return ''.join(f'{changed.get(i, f"value_{i} = {name!r}")}\n' for i in range(1, count + 1))
+
+
+def build_fixture(repo_path: str) -> Dict[str, str]:
+    """ Build the fixture repository, returning the hash of each commit by label """
+    os.makedirs(repo_path)
+    git(repo_path, 'init', '-q')
+    git(repo_path, 'symbolic-ref', 'HEAD', 'refs/heads/main')
+    commits = dict()
+
+    def commit(label: str, *add_args):
+        env = dict(os.environ, GIT_AUTHOR_NAME='a', GIT_AUTHOR_EMAIL='a@a', GIT_COMMITTER_NAME='a', GIT_COMMITTER_EMAIL='a@a',
+                   GIT_AUTHOR_DATE=f'{1600000000 + len(commits) * 100} +0000', GIT_COMMITTER_DATE=f'{1600000000 + len(commits) * 100} +0000')
+        git(repo_path, 'add', '-A', *add_args)
+        git(repo_path, '-c', 'commit.gpgsign=false', 'commit', '-q', '--allow-empty', '-m', label, env=env)
+        commits[label] = git(repo_path, 'rev-parse', 'HEAD').strip()
+
+    # a large initial commit, with all the edge cases
+    for file_path in LARGE_FILES + ['src/a.py', SPACED, UNICODE, QUOTED]:
+        write(repo_path, file_path, lines(file_path))
+    write(repo_path, NO_EOL, lines(NO_EOL).rstrip('\n'))
+    write(repo_path, 'data.bin', bytes(range(256)) * 4, 'wb')
+    os.symlink('src/a.py', os.path.join(repo_path, 'link'))
+    commit('init')
+
+    # a large commit contiguous to the initial one
+    for file_path in LARGE_FILES:
+        write(repo_path, file_path, lines(file_path, changed={2: 'big = 2'}))
+    commit('big')
+
+    for file_path in ['src/a.py', SPACED, UNICODE, QUOTED]:
+        write(repo_path, file_path, lines(file_path, changed={4: 'edit = 4', 5: 'edit = 5'}))
+    write(repo_path, NO_EOL, lines(NO_EOL, changed={10: 'edit = 10'}).rstrip('\n'))
+    commit('edit')
+
+    # rename across extensions with a small change, and a mode change
+    git(repo_path, 'mv', 'src/a.py', 'src/a.txt')
+    write(repo_path, 'src/a.txt', lines('src/a.py', changed={4: 'edit = 4', 5: 'edit = 5', 9: 'rename = 9'}))
+    os.chmod(os.path.join(repo_path, LARGE_FILES[0]), 0o755)
+    commit('rename')
+
+    git(repo_path, 'checkout', '-q', '-b', 'side')
+    write(repo_path, LARGE_FILES[1], lines(LARGE_FILES[1], changed={2: 'big = 2', 3: 'side = 3'}))
+    commit('side')
+    git(repo_path, 'checkout', '-q', 'main')
+    write(repo_path, LARGE_FILES[2], lines(LARGE_FILES[2], changed={2: 'big = 2', 3: 'main = 3'}))
+    commit('main')
+    env = dict(os.environ, GIT_AUTHOR_NAME='a', GIT_AUTHOR_EMAIL='a@a', GIT_COMMITTER_NAME='a', GIT_COMMITTER_EMAIL='a@a',
+               GIT_AUTHOR_DATE='1600009000 +0000', GIT_COMMITTER_DATE='1600009000 +0000')
+    git(repo_path, '-c', 'commit.gpgsign=false', 'merge', '-q', '--no-ff', '-m', 'merge', 'side', env=env)
+    commits['merge'] = git(repo_path, 'rev-parse', 'HEAD').strip()
+
+    # the fix commit, changing all the edge cases
+    write(repo_path, 'src/a.txt', lines('src/a.py', changed={4: 'fix = 4', 5: 'edit = 5', 9: 'fix = 9'}))
+    write(repo_path, SPACED, lines(SPACED, changed={4: 'fix = 4', 5: 'fix = 5', 7: 'fix = 7'}))
+    write(repo_path, UNICODE, lines(UNICODE, changed={1: 'fix = 1', 4: 'edit = 4', 5: 'fix = 5'}))
+    write(repo_path, QUOTED, lines(QUOTED, changed={2: 'fix = 2', 4: 'edit = 4', 5: 'edit = 5'}) + 'added = 11\n')
+    write(repo_path, NO_EOL, lines(NO_EOL, changed={10: 'fix = 10'}).rstrip('\n'))
+    write(repo_path, 'data.bin', bytes(range(255, -1, -1)) * 4, 'wb')
+    os.remove(os.path.join(repo_path, 'link'))
+    os.symlink(SPACED, os.path.join(repo_path, 'link'))
+    os.remove(os.path.join(repo_path, LARGE_FILES[3]))
+    write(repo_path, 'src/new.py', lines('src/new.py'))
+    commit('fix')
+
+    return commits
+
+
+def pydriller_impacted_files(repo_path: str, fix_commit_hash: str, file_ext_to_parse: List[str], only_deleted_lines: bool) -> list:
+    """ Impacted files computed as in the PyDriller implementation """
+    impacted_files = list()
+    for mod in GitRepository(repo_path).get_commit(fix_commit_hash).modifications:
+        if not mod.old_path:
+            continue
+        if file_ext_to_parse:
+            ext = mod.filename.split('.')
+            if len(ext) < 2 or (len(ext) > 1 and ext[1] not in file_ext_to_parse):
+                continue
+
+        file_path = mod.new_path
+        if mod.change_type == ModificationType.DELETE or mod.change_type == ModificationType.RENAME:
+            file_path = mod.old_path
+
+        lines_added = [added[0] for added in mod.diff_parsed['added']]
+        lines_deleted = [deleted[0] for deleted in mod.diff_parsed['deleted']]
+        mod_lines = lines_deleted if only_deleted_lines else [ld for ld in lines_deleted if ld in lines_added]
+        if len(mod_lines) > 0:
+            impacted_files.append((file_path, mod_lines))
+
+    return impacted_files
+
+
+def pydriller_change_size(repo_path: str, commit_hash: str, max_change_size: int) -> set:
+    """ Contiguous large commits computed as in the PyDriller implementation """
+    to_exclude = set()
+    for commit in RepositoryMining(repo_path, to_commit=commit_hash, order='reverse').traverse_commits():
+        if len(commit.modifications) > max_change_size:
+            to_exclude.add(commit.hash)
+        else:
+            break
+    return to_exclude
+
+
+def main(work_dir: str):
+    repo_path = os.path.join(work_dir, REPO_NAME)
+    commits = build_fixture(repo_path)
+    labels = {commit_hash: label for label, commit_hash in commits.items()}
+
+    """ test impacted files (git diff-tree) """
+    szz = BaseSZZ(repo_full_name=REPO_NAME, repo_url=None, repos_dir=work_dir, checkout_free=True)
+    try:
+        # the binary file and the added file are not impacted, the renamed file is a modification
+        oracle = {
+            (None, True): [('link', [1]), ('src/a.txt', [4, 9]), (LARGE_FILES[3], list(range(1, 11))), (NO_EOL, [10]),
+                           (QUOTED, [2]), (SPACED, [4, 5, 7]), (UNICODE, [1, 5])],
+            (('py',), True): [(LARGE_FILES[3], list(range(1, 11))), (NO_EOL, [10]), (QUOTED, [2]), (SPACED, [4, 5, 7]),
+                              (UNICODE, [1, 5])],
+            (None, False): [('link', [1]), ('src/a.txt', [4, 9]), (NO_EOL, [10]), (QUOTED, [2]), (SPACED, [4, 5, 7]),
+                            (UNICODE, [1, 5])],
+        }
+        for (file_ext_to_parse, only_deleted_lines), expected in oracle.items():
+            file_ext_to_parse = list(file_ext_to_parse) if file_ext_to_parse else None
+            impacted_files = sorted((f.file_path, list(f.modified_lines))
+                                    for f in szz.get_impacted_files(commits['fix'], file_ext_to_parse, only_deleted_lines))
+            reference = sorted(pydriller_impacted_files(repo_path, commits['fix'], file_ext_to_parse, only_deleted_lines))
+            print(file_ext_to_parse, only_deleted_lines, impacted_files)
+            assert impacted_files == reference
+            assert impacted_files == sorted(expected)
+        # merge commits have no impacted files
+        assert szz.get_impacted_files(commits['merge']) == []
+    finally:
+        szz.close()
+
+    """ test change sizes (git log --name-only) """
+    change_size_index = ChangeSizeIndex(repo_path)
+    oracle = {'init': {'init'}, 'big': {'big', 'init'}}
+    for label, commit_hash in commits.items():
+        for max_change_size in (1, 20):
+            large_commits = change_size_index.contiguous_large_commits(commit_hash, max_change_size)
+            print(label, max_change_size, sorted(labels[h] for h in large_commits))
+            assert large_commits == pydriller_change_size(repo_path, commit_hash, max_change_size)
+        assert set(labels[h] for h in change_size_index.contiguous_large_commits(commit_hash, 20)) == oracle.get(label, set())
+
+    """ test meta-changes (git log --raw) """
+    meta_change_index = MetaChangeIndex(repo_path)
+    file_paths = set(LARGE_FILES + ['src/a.py', 'src/a.txt', SPACED, UNICODE, QUOTED, NO_EOL, 'data.bin', 'link', 'src/new.py'])
+    oracle = {('init', file_path): {ModificationType.ADD} for file_path in file_paths - {'src/a.txt', 'src/new.py'}}
+    oracle.update({('rename', 'src/a.py'): {ModificationType.RENAME}, ('rename', 'src/a.txt'): {ModificationType.RENAME},
+                   ('fix', LARGE_FILES[3]): {ModificationType.DELETE}, ('fix', 'src/new.py'): {ModificationType.ADD}})
+    # a mode change is a modification (PyDriller reports it as UNKNOWN)
+    supported_change_types = {ModificationType.ADD, ModificationType.DELETE, ModificationType.RENAME, ModificationType.COPY}
+    for label, commit_hash in commits.items():
+        pydriller_commit = GitRepository(repo_path).get_commit(commit_hash)
+        assert meta_change_index.is_merge(commit_hash) == pydriller_commit.merge == (label == 'merge')
+
+        show_summary = Repo(repo_path).git.show(commit_hash, '--summary').splitlines()
+        for file_path in file_paths:
+            is_mode_change = any(line.strip().startswith('mode change') and file_path in line for line in show_summary)
+            assert meta_change_index.is_mode_change(commit_hash, file_path) == is_mode_change == ((label, file_path) == ('rename', LARGE_FILES[0]))
+
+            change_types = set(m.change_type for m in pydriller_commit.modifications
+                               if (file_path == m.new_path or file_path == m.old_path) and m.change_type in supported_change_types)
+            assert meta_change_index.get_change_types(commit_hash, file_path) == change_types == oracle.get((label, file_path), set())
+
+    """ test changed lines (git log --numstat) """
+    lines_changed_index = LinesChangedIndex(repo_path)
+    oracle = {'init': 271, 'big': 44, 'edit': 18, 'rename': 2, 'side': 2, 'main': 2, 'merge': 0, 'fix': 41}
+    for label, commit_hash in commits.items():
+        reference = sum(LinesCount(path_to_repo=repo_path, from_commit=commit_hash, to_commit=commit_hash).count().values())
+        print(label, lines_changed_index.lines_changed(commit_hash), reference)
+        assert lines_changed_index.lines_changed(commit_hash) == reference == oracle[label]
+
+    """ test blamed lines (git blame --line-porcelain) """
+    repo = Repo(repo_path)
+    rev = f'{commits["fix"]}^'
+    oracle = {
+        'src/a.txt': (['9,10'], [('rename', 'src/a.txt', 9, 9), ('init', 'src/a.py', 10, 10)]),
+        SPACED: (['7,7'], [('init', SPACED, 7, 7)]),
+        UNICODE: (['7,7'], [('init', UNICODE, 7, 7)]),
+        QUOTED: (['7,7'], [('init', QUOTED, 7, 7)]),
+        NO_EOL: (['9,10'], [('init', NO_EOL, 9, 9), ('edit', NO_EOL, 10, 10)]),
+    }
+    # the edit commit changed only the last line of the file without final newline
+    for file_path, (line_ranges, expected) in oracle.items():
+        line_ranges = ['1,1', '4,5'] + line_ranges
+        orig_path = 'src/a.py' if file_path == 'src/a.txt' else file_path
+        edit = 'init' if file_path == NO_EOL else 'edit'
+        expected = [('init', orig_path, 1, 1), (edit, orig_path, 4, 4), (edit, orig_path, 5, 5)] + expected
+
+        blame_args = ['-w', '-M', '-C'] + [f'-L{line_range}' for line_range in line_ranges]
+        blamed = sorted([(bl.commit_hash, bl.orig_path, bl.orig_line_num, bl.final_line_num, bl.line)
+                         for bl in blame_lines(repo_path, rev, file_path, blame_args)], key=lambda b: b[3])
+        print(file_path, [(labels[h], p, o, f) for h, p, o, f, _ in blamed])
+        assert [(labels[h], p, o, f) for h, p, o, f, _ in blamed] == expected
+
+        # GitPython does not unquote the paths with special characters
+        reference = list()
+        for entry in repo.blame_incremental(rev, file_path, w=True, M=True, C=True, L=line_ranges):
+            entry_orig_path = unquote_git_path(entry.orig_path)
+            content = repo.git.show(f'{entry.commit.hexsha}:{entry_orig_path}').split('\n')
+            for orig_line_num, final_line_num in zip(entry.orig_linenos, entry.linenos):
+                reference.append((entry.commit.hexsha, entry_orig_path, orig_line_num, final_line_num, content[orig_line_num - 1]))
+        assert blamed == sorted(reference, key=lambda b: b[3])
+
+    print('+++ DONE +++')
+
+
+if __name__ == "__main__":
+    work_dir = tempfile.mkdtemp()
+    try:
+        main(work_dir)
+    finally:
+        rmtree(work_dir, ignore_errors=True)
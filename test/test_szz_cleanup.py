@@ -0,0 +1,60 @@
+"""
+Regression test of the release of the SZZ instances: deleting an instance without calling close() removes its copy of
+the repository at once, without waiting for a garbage collection (i.e. the instance is not in a reference cycle).
+
+USAGE: python test/test_szz_cleanup.py (from the root of the project)
+"""
+import gc
+import logging as log
+import os
+import sys
+import tempfile
+from shutil import rmtree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_git_parsers import REPO_NAME, build_fixture
+from szz.ma_szz import MASZZ
+from szz.r_szz import RSZZ
+from szz.l_szz import LSZZ
+from szz.ra_szz import RASZZ
+from szz.multi_szz import MultiSZZ
+
+log.basicConfig(level=log.WARNING, format='%(asctime)s :: %(levelname)s :: %(message)s')
+
+
+def main(work_dir: str):
+    repos_dir = os.path.join(work_dir, 'repos')
+    commits = build_fixture(os.path.join(repos_dir, REPO_NAME))
+    # the temp folders of the instances are created in the current directory
+    run_dir = os.path.join(work_dir, 'run')
+    os.makedirs(run_dir)
+    os.chdir(run_dir)
+
+    gc.disable()
+    for szz_class in (MASZZ, RSZZ, LSZZ, MultiSZZ):
+        szz = szz_class(repo_full_name=REPO_NAME, repo_url=None, repos_dir=repos_dir)
+        impacted_files = szz.get_impacted_files(commits['fix'], file_ext_to_parse=['py'])
+        szz.find_bic(commits['fix'], impacted_files, max_change_size=20)
+        del szz
+        print(szz_class.__name__, os.listdir(run_dir))
+        assert os.listdir(run_dir) == []
+
+    # Refactoring Miner is not run, only the instance is checked
+    szz = RASZZ(repo_full_name=REPO_NAME, repo_url=None, repos_dir=repos_dir)
+    del szz
+    print(RASZZ.__name__, os.listdir(run_dir))
+    assert os.listdir(run_dir) == []
+    gc.enable()
+
+    print('+++ DONE +++')
+
+
+if __name__ == "__main__":
+    work_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        main(work_dir)
+    finally:
+        os.chdir(cwd)
+        rmtree(work_dir, ignore_errors=True)